@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Benchmark `parse_tlp_stats()` against the captured `tlp-stat` corpus.
+
+For each file in `benchmarks/corpus/`, reports parse throughput (lines per
+second, mean time per parse) and memory allocation per parse, measured with
+`tracemalloc` (peak bytes during a parse, and the number of memory blocks
+held by the parse result).
+
+Usage:
+    python benchmarks/bench_parser.py [--repeat N] [FILE ...]
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from battery_boost.tlp_parser import parse_tlp_stats
+
+CORPUS = Path(__file__).with_name('corpus')
+
+
+def measure_allocations(text: str) -> tuple[int, int]:
+    """Return (peak bytes, result blocks) allocated by a single parse."""
+    parse_tlp_stats(text)  # Warm up regex and attribute caches.
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = parse_tlp_stats(text)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'lineno'))
+    return peak, blocks
+
+
+def benchmark(path: Path, repeat: int) -> None:
+    """Print throughput and allocation figures for one corpus file."""
+    text = path.read_text()
+    lines = len(text.splitlines())
+    timer = timeit.Timer(lambda: parse_tlp_stats(text))
+    best = min(timer.repeat(repeat=5, number=repeat)) / repeat
+    peak, blocks = measure_allocations(text)
+    print(f"{path.name:<40} {lines:>5} lines "
+          f"{best * 1e6:>8.1f} µs/parse "
+          f"{lines / best:>12,.0f} lines/s "
+          f"{peak / 1024:>7.1f} KiB peak "
+          f"{blocks:>5} blocks")
+
+
+def main() -> None:
+    """Run the benchmark over the corpus or the given files."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', type=Path,
+                        help="tlp-stat output files (default: the corpus)")
+    parser.add_argument('--repeat', type=int, default=2_000,
+                        help="parses per timing run")
+    args = parser.parse_args()
+    for path in args.files or sorted(CORPUS.glob('*.txt')):
+        benchmark(path, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
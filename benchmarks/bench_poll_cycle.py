@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark of Battery Boost startup, refresh and toggle.
+
+Builds a fake environment in a temporary directory:
+
+- `tlp`, `tlp-stat`, `sudo` and `systemctl` executables, placed first on PATH.
+  `sudo` runs its command as the current user; `tlp fullcharge` and
+  `tlp start` rewrite the fake thresholds; `tlp-stat -b` prints a corpus file.
+- A fake `/sys/class/power_supply` tree with one battery and an AC adaptor.
+
+The real `App` is then driven without user interaction: startup (with the
+password dialog answered automatically), `refresh_battery_stats()` until the
+result is displayed, and `toggle_state()` until the new stats are displayed.
+
+Cached queries are dropped before each cycle, so each cycle performs a real
+read. For each phase the wall-clock latency (p50, p99, max) and CPU time per
+cycle are reported. CPU time is split between this process (including the
+background poller thread) and reaped child processes such as `sudo`.
+
+Tk requires a display. On a headless machine, run under Xvfb:
+
+    xvfb-run python benchmarks/bench_poll_cycle.py [--cycles N] [--no-sysfs-thresholds]
+                                                   [--fake-backend]
+
+`--no-sysfs-thresholds` omits the threshold attributes from the fake sysfs
+tree, forcing the `tlp-stat` fallback. `--fake-backend` reads battery
+statistics from an in-memory `FakeBackend` instead, measuring the app's own
+overhead without any I/O. The backend selected by the probe is reported.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from tkinter import simpledialog
+from typing import Callable
+
+from battery_boost import power_supply
+from battery_boost.app import App
+from battery_boost.backends import FakeBackend, selected_backend, use_backends
+from battery_boost.battery import BatterySnapshot, battery_info
+from battery_boost.helper_functions import Config
+from battery_boost.query_cache import queries
+from battery_boost.shell_commands import revoke_permissions
+
+CORPUS = Path(__file__).with_name('corpus')
+
+_FAKE_SUDO = """#!/bin/sh
+# Drop sudo options and run the command as the current user.
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -n|-S|-v|--remove-timestamp) shift ;;
+        *) break ;;
+    esac
+done
+[ $# -eq 0 ] && { cat > /dev/null; exit 0; }
+exec "$@"
+"""
+
+_FAKE_TLP = """#!/bin/sh
+BAT="{battery}"
+case "$1" in
+    fullcharge) start=96; end=100 ;;
+    start) start=75; end=80 ;;
+    *) exit 1 ;;
+esac
+[ -e "$BAT/charge_control_start_threshold" ] && echo $start > "$BAT/charge_control_start_threshold"
+[ -e "$BAT/charge_control_end_threshold" ] && echo $end > "$BAT/charge_control_end_threshold"
+echo "TLP started in AC mode (auto)."
+"""
+
+_FAKE_TLP_STAT = """#!/bin/sh
+case "$1" in
+    -s) printf 'State          = enabled\\nLast run       = 09:14:02 AM, 4 sec(s) ago\\n' ;;
+    *) cat "{corpus}" ;;
+esac
+"""
+
+_FAKE_SYSTEMCTL = """#!/bin/sh
+echo active
+"""
+
+
+def make_fake_bin(root: Path, battery: Path) -> Path:
+    """Create fake TLP, sudo and systemctl executables. Return their directory."""
+    bin_dir = root / 'bin'
+    bin_dir.mkdir()
+    scripts = {
+        'sudo': _FAKE_SUDO,
+        'tlp': _FAKE_TLP.format(battery=battery),
+        'tlp-stat': _FAKE_TLP_STAT.format(
+            corpus=CORPUS / 'single_battery_generic_tlp15.txt'),
+        'systemctl': _FAKE_SYSTEMCTL,
+    }
+    for name, text in scripts.items():
+        path = bin_dir / name
+        path.write_text(text)
+        path.chmod(0o755)
+    return bin_dir
+
+
+def make_fake_sysfs(root: Path, thresholds: bool) -> Path:
+    """Create a fake power supply class tree. Return its path."""
+    base = root / 'power_supply'
+    attributes = {
+        'AC': {'type': 'Mains', 'online': '1'},
+        'BAT0': {'type': 'Battery',
+                 'status': 'Charging',
+                 'capacity': '60',
+                 'energy_full_design': '50006000',
+                 'energy_full': '47214000',
+                 'energy_now': '28337000',
+                 'power_now': '8764000'},
+    }
+    if thresholds:
+        attributes['BAT0'].update({'charge_control_start_threshold': '75',
+                                   'charge_control_end_threshold': '80'})
+    for device, values in attributes.items():
+        (base / device).mkdir(parents=True)
+        for name, value in values.items():
+            (base / device / name).write_text(value + '\n')
+    return base
+
+
+class Sample:
+    """Wall-clock and CPU time of one measured cycle."""
+
+    def __init__(self) -> None:
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._children = self._children_cpu()
+        self.wall = self.cpu = self.children = 0.0
+
+    @staticmethod
+    def _children_cpu() -> float:
+        times = os.times()
+        return times.children_user + times.children_system
+
+    def stop(self) -> 'Sample':
+        """Record elapsed times."""
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        self.children = self._children_cpu() - self._children
+        return self
+
+
+def wait_until_displayed(app: App) -> None:
+    """Run the Tk event loop until pending toggles and polls are displayed."""
+    # pylint: disable=protected-access
+    while (app._toggle_future is not None
+           or app._collect_job is not None
+           or (app._poller and app._poller.busy)):
+        app.update()
+        time.sleep(0.001)
+
+
+def measure(app: App, action: Callable[[], None], cycles: int) -> list[Sample]:
+    """Run `action` until its stats are displayed, `cycles` times.
+
+    Cached query results are dropped before each cycle, so every cycle reads
+    the battery instead of reusing the previous cycle's result.
+    """
+    samples = []
+    for _ in range(cycles):
+        queries.invalidate()
+        sample = Sample()
+        action()
+        wait_until_displayed(app)
+        samples.append(sample.stop())
+        # Keep the periodic refresh from running during measurements.
+        # pylint: disable=protected-access
+        if app._refresh_job:
+            app.after_cancel(app._refresh_job)
+    return samples
+
+
+def report(phase: str, samples: list[Sample]) -> None:
+    """Print latency percentiles and mean CPU time for a phase."""
+    walls = sorted(sample.wall * 1000 for sample in samples)
+    p50 = statistics.median(walls)
+    p99 = walls[min(len(walls) - 1, round(0.99 * (len(walls) - 1)))]
+    cpu = statistics.fmean(sample.cpu for sample in samples) * 1000
+    children = statistics.fmean(sample.children for sample in samples) * 1000
+    print(f"{phase:<10} n={len(samples):<5} "
+          f"p50={p50:8.2f} ms  p99={p99:8.2f} ms  max={walls[-1]:8.2f} ms  "
+          f"cpu={cpu:7.2f} ms  children cpu={children:7.2f} ms")
+
+
+def main() -> None:
+    """Build the fake environment, drive the app and report timings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=200,
+                        help="refresh cycles to measure (toggles: a quarter of this)")
+    parser.add_argument('--no-sysfs-thresholds', action='store_true',
+                        help="omit sysfs thresholds to force the tlp-stat fallback")
+    parser.add_argument('--fake-backend', action='store_true',
+                        help="read battery statistics from memory, without I/O")
+    args = parser.parse_args()
+    if not os.environ.get('DISPLAY'):
+        sys.exit("No display. Run under Xvfb, e.g. `xvfb-run python "
+                 "benchmarks/bench_poll_cycle.py`.")
+
+    with tempfile.TemporaryDirectory(prefix='battery-boost-bench-') as tmp:
+        root = Path(tmp)
+        sysfs = make_fake_sysfs(root, thresholds=not args.no_sysfs_thresholds)
+        bin_dir = make_fake_bin(root, sysfs / 'BAT0')
+        os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+        # power_supply reads this at call time, so the app sees the fake tree.
+        power_supply.POWER_SUPPLY_PATH = sysfs
+        simpledialog.askstring = lambda *_args, **_kwargs: 'password'
+        if args.fake_backend:
+            use_backends(FakeBackend(battery_info((
+                BatterySnapshot('BAT0', 'Charging', 75, 80, 55.0, 94.0),))))
+
+        startup = Sample()
+        # The fast toggle writes the real /sys/class/power_supply as root, so
+        # measure toggles through the fake `tlp` instead.
+        app = App(Config(toggle_mode='tlp'))
+        wait_until_displayed(app)
+        report('startup', [startup.stop()])
+        backend = selected_backend()
+        print(f"backend: {backend.name if backend else 'none'}")
+        try:
+            report('refresh', measure(app, app.refresh_battery_stats, args.cycles))
+            report('toggle', measure(app, app.toggle_state, max(1, args.cycles // 4)))
+        finally:
+            revoke_permissions()
+            try:
+                app.quit_app()
+            except SystemExit:
+                pass
+
+
+if __name__ == '__main__':
+    main()
@@ -3,23 +3,32 @@
 
 Initialises and launches the Tkinter GUI for managing TLP battery charge profiles.
 Battery Boost allows users to toggle between normal optimization and full-charge modes,
-with battery status display.
+with battery status display. Headless commands (`status`, `fullcharge`,
+`default`) run without importing Tkinter.
 """
 import logging
 import sys
 
-from battery_boost.app import App
+from battery_boost.cli import run_command
 from battery_boost.constants import DEBUG
 from battery_boost.helper_functions import parse_args
+from battery_boost.profiling import profiler
 from battery_boost.shell_commands import revoke_permissions
+from battery_boost.single_instance import RAISE, SingleInstance, send_request
+from battery_boost.startup import StartupTrace
 
 
 def main() -> None:
     """Entry point of the TLP Battery Boost application.
 
     - Configures the logging level based on the `DEBUG` constant.
-    - Parses command-line arguments to determine the GUI theme and font settings.
-    - Instantiates the main `App` class with the chosen theme and fonts.
+    - Parses command-line arguments to determine the GUI theme, font and
+      polling settings.
+    - Starts profiling, if requested.
+    - Runs a headless command and exits, if one was given.
+    - Hands over to an instance that is already running, if any: its window
+      is raised, and this process exits.
+    - Instantiates the main `App` class with the chosen configuration.
     - Starts the Tkinter main event loop.
     - Handles user interrupts and ensures clean shutdown.
     - Revokes any elevated permissions acquired during execution.
@@ -37,10 +46,38 @@ def main() -> None:
         format="%(levelname)s: %(name)s %(message)s",
     )
 
-    theme_choice, font_normal, font_small, factor = parse_args(sys.argv[1:])
+    trace = StartupTrace()
+    config = parse_args(sys.argv[1:])
+    trace.mark('arguments')
+    if config.profile:
+        profiler.start(config.profile_output)
+        profiler.install_signal_handler()
+    if config.command:
+        status = run_command(config.command, config.json, config.metrics_path)
+        profiler.stop()
+        sys.exit(status)
+
+    # Hand over to a running instance, rather than authenticating and
+    # resetting TLP again.
+    if send_request(RAISE) is not None:
+        return
+    lock = SingleInstance()
+    instance: SingleInstance | None = lock
+    try:
+        if not lock.acquire():
+            print("Battery Boost is already starting.", file=sys.stderr)
+            return
+    except OSError as exc:
+        logging.warning("Single-instance lock not available: %s", exc)
+        instance = None
+
+    # Imported here so that headless commands never load Tkinter.
+    from battery_boost.app import App  # pylint: disable=import-outside-toplevel
+    trace.enabled = config.startup_trace
+    trace.mark('gui imports')
     app = None
     try:
-        app = App(theme_choice, font_normal, font_small, factor)
+        app = App(config, trace, instance)
         app.mainloop()
     except KeyboardInterrupt:
         if app:
@@ -50,6 +87,9 @@ def main() -> None:
         logging.critical(exc)
         sys.exit(1)
     finally:
+        profiler.stop()  # If the app did not quit normally.
+        if instance:
+            instance.close()
         revoke_permissions()
 
 
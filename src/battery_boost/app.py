@@ -3,31 +3,58 @@
 Provides a simple interface to toggle between normal and full-charge modes,
 refresh sudo authentication, and display battery statistics.
 """
+import logging
+import subprocess
 import sys
+import time
 import tkinter as tk
+from concurrent.futures import Future
 from tkinter import ttk
 from tkinter import messagebox
 from typing import NoReturn
 
 from battery_boost.authenticate import authenticate
+from battery_boost.battery import (
+    DISPLAYED_FIELDS,
+    BatteryInfo,
+    Segment,
+    battery_info_segments,
+    diff_snapshots,
+    message_info
+)
+from battery_boost.command_engine import CommandEngine, deliver
 from battery_boost.constants import (
-    ThemeKeys,
-    DEFAULT_THEME,
     BatteryState,
     STATES,
-    REFRESH_INTERVAL_MS
+    RESULT_CHECK_INTERVAL_MS,
+    TOGGLE_DEBOUNCE_MS
 )
 from battery_boost.helper_functions import (
-    command_on_path,
-    get_battery_stats,
-    on_ac_power
+    Config,
+    apply_profile_async,
+    get_battery_stats_async,
+    on_ac_power,
+    reset_tlp,
+    tlp_ready_error
 )
+from battery_boost.estimator import ChargeEstimator, charge_target, format_eta
+from battery_boost.history import HistoryRecorder
+from battery_boost.metrics import MetricsExporter
+from battery_boost.poller import StatsPoller
+from battery_boost.power_supply import invalidate_supply_index
+from battery_boost.profile_queue import ProfileQueue, ProfileResult
+from battery_boost.profiling import profiler
+from battery_boost.query_cache import BATTERY_STATS, queries
+from battery_boost.scheduler import PollScheduler
+from battery_boost.single_instance import RAISE, SingleInstance
 from battery_boost.shell_commands import (
     initialise_tlp,
-    tlp_toggle_state,
-    tlp_active,
-    tlp_running
+    toggle_allowed,
+    toggle_failed
 )
+from battery_boost.startup import BackgroundCall, StartupTrace
+from battery_boost.stats_view import StatsText
+from battery_boost.uevents import UeventMonitor
 
 
 class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
@@ -37,38 +64,58 @@ class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
     and periodically refreshes display of battery statistics.
     """
     def __init__(self,
-                 theme: ThemeKeys = DEFAULT_THEME,
-                 standard_font: tuple[str, int] = ('TkDefaultFont', 12),
-                 small_font: tuple[str, int] = ('TkDefaultFont', 10),
-                 scale_factor: float = 1.0,
-                 ) -> None:
+                 config: Config = Config(),
+                 startup_trace: StartupTrace | None = None,
+                 instance: SingleInstance | None = None) -> None:
         """Initialize the Tkinter UI, state, and baseline TLP configuration.
 
         Args:
-            theme: Theme colors to apply.
-            standard_font: Font for main UI elements.
-            small_font: Font for secondary UI elements.
-            scale_factor: Scale factor for UI sizing.
+            config: Theme, fonts, polling and other options; see `Config`.
+                Headless and profiling options are ignored.
+            startup_trace: Records startup phase timings, for `--startup-trace`.
+            instance: Single-instance lock held for this app. The app listens
+                for requests from later launches on its control socket.
         """
+        self._trace = startup_trace or StartupTrace()
+        # Check TLP in the background, overlapping Tk setup and the password dialog.
+        tlp_check = BackgroundCall(tlp_ready_error)
         super().__init__()
+        self._trace.mark('tk init')
         self._refresh_job: str | None = None
-
-        self.theme = theme
-        self.standard_font = standard_font
-        self.small_font = small_font
-        self.scale_factor = scale_factor
+        self._collect_job: str | None = None
+        self._poller: StatsPoller | None = None
+        self._scheduler = PollScheduler(config.poll_policy)
+        self._mapped = True
+        self._obscured = False
+        self._history = HistoryRecorder(config.history_path) if config.history_path else None
+        self._metrics = MetricsExporter(config.metrics_path) if config.metrics_path else None
+        self._poll_seconds: float | None = None
+        self._instance = instance
+        self._estimator = ChargeEstimator()
+        self._eta_text = ""
+        self._uevents: UeventMonitor | None = None
+        self._fast_toggle = config.toggle_mode == 'fast'
+        self._engine = CommandEngine()
+        self._profiles = ProfileQueue(
+            self._engine,
+            lambda full_charge: apply_profile_async(self._engine,
+                                                    full_charge,
+                                                    self._fast_toggle),
+            debounce=TOGGLE_DEBOUNCE_MS / 1000)
+        self._toggle_future: Future[ProfileResult] | None = None
+        self._button_style = ''
+
+        self.theme = config.theme
+        self.standard_font = config.standard_font
+        self.small_font = config.small_font
+        self.scale_factor = config.scale_factor
         self.withdraw()
         self.protocol('WM_DELETE_WINDOW', self.quit_app)
 
-        # Fail early if TLP not available.
-        self._verify_tlp_ready()
-
-        while not self.ensure_ac_power():
-            # Keep checking until either we have AC power, or we exit.
-            pass
+        self._acquire_root(tlp_check)
 
-        # Acquire root for commands.
-        authenticate(self)
+        # Reset TLP (if needed) in the background while the widgets are built.
+        tlp_start = BackgroundCall(lambda: reset_tlp(config.force_reset))
 
         self.ui_state: BatteryState = BatteryState.DEFAULT
 
@@ -76,18 +123,22 @@ class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
         self._init_styles()
         self._init_widgets()
         self._layout_widgets()
-
-        # Bind Ctrl+Q keyboard shortcut
-        self.bind('<Control-KeyPress-q>', lambda e: self.quit_app())
+        self._trace.mark('widgets')
+        self._init_bindings()
 
         # Show main window.
         self.deiconify()
 
         # Ensure TLP is in a known (default enabled) state.
-        initialise_tlp(self)
+        initialise_tlp(self, tlp_start)
+        self._trace.mark('tlp reset wait')
+        self._trace.add('tlp reset', tlp_start.elapsed)
         self.apply_state()
-        self.battery_stats = get_battery_stats()
-        self.write_stats(self.battery_stats['info'])
+        self.battery_stats: BatteryInfo = message_info("Reading battery status...")
+        self.render_stats()
+        self._poller = StatsPoller(self._fetch_battery_stats)
+        self._init_uevents()
+        self._init_instance()
         self.refresh_battery_stats()
 
     def _init_window(self) -> None:
@@ -158,12 +209,21 @@ class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
                                            style='DefaultInstruction.TLabel',
                                            text=instructions,
                                            justify='center')
-        self.text_box = tk.Text(self, height=2,
-                                background=self.theme['default_bg'],
-                                foreground=self.theme['text'],
-                                font=self.small_font)
-        # noinspection PyTypeChecker
-        self.text_box.config(state=tk.DISABLED)
+        self.text_box = StatsText(self, height=2,
+                                  background=self.theme['default_bg'],
+                                  foreground=self.theme['text'],
+                                  font=self.small_font)
+
+    def _init_bindings(self) -> None:
+        """Bind keyboard shortcuts and window events."""
+        # Bind Ctrl+Q keyboard shortcut
+        self.bind('<Control-KeyPress-q>', lambda e: self.quit_app())
+        # Poll quickly again when the user returns to the window.
+        self.bind('<FocusIn>', self._on_focus_in)
+        # Poll only as a watchdog while the window is minimized or hidden.
+        self.bind('<Map>', self._on_map)
+        self.bind('<Unmap>', self._on_unmap)
+        self.bind('<Visibility>', self._on_visibility)
 
     def _layout_widgets(self) -> None:
         self.top_label.pack(pady=int(10 * self.scale_factor))
@@ -176,18 +236,118 @@ class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
                            expand=True,
                            fill=tk.BOTH)
 
-    def _verify_tlp_ready(self) -> None:
-        """Verify that TLP is installed and active. Quit on fatal error."""
-        if not command_on_path('tlp'):
-            self.quit_on_error("TLP is not installed or not in PATH.",
-                               "Fatal Error")
-        if command_on_path('systemctl'):
-            if not tlp_running():
-                self.quit_on_error("TLP service is not active.",
-                                   "Fatal Error")
-        elif not tlp_active():  # Less reliable fallback.
-            self.quit_on_error("TLP service is not active.",
-                               "Fatal Error")
+    def _acquire_root(self, tlp_check: BackgroundCall[str | None]) -> None:
+        """Require AC power, then authenticate. Quits if TLP is not usable.
+
+        Args:
+            tlp_check: The background `tlp_ready_error()` call.
+        """
+        while not self.ensure_ac_power():
+            # Keep checking until either we have AC power, or we exit.
+            pass
+        self._trace.mark('ac power check')
+
+        # Fail before prompting if TLP is known to be unavailable by now.
+        if tlp_check.done:
+            self._verify_tlp_ready(tlp_check.result())
+
+        # Acquire root for commands.
+        authenticate(self)
+        self._trace.mark('authentication')
+        self._verify_tlp_ready(tlp_check.result())
+        self._trace.mark('tlp check wait')
+        self._trace.add('tlp check', tlp_check.elapsed)
+
+    def _verify_tlp_ready(self, error: str | None) -> None:
+        """Quit on a fatal error from `tlp_ready_error()`."""
+        if error:
+            self.quit_on_error(error, "Fatal Error")
+
+    def _init_uevents(self) -> None:
+        """Refresh on power supply uevents, if the kernel provides them."""
+        try:
+            self._uevents = UeventMonitor()
+        except OSError:
+            return  # Fall back to fast polling.
+        self.tk.createfilehandler(self._uevents.fileno(),
+                                  tk.READABLE,
+                                  lambda *_: self._on_uevent())
+
+    def _on_uevent(self) -> None:
+        """Refresh battery statistics when a power supply changes."""
+        with profiler.timed('uevent'):
+            events = self._uevents.read_events() if self._uevents else []
+        if any(event.get('ACTION') in ('add', 'remove') for event in events):
+            invalidate_supply_index()
+        if events:
+            queries.invalidate(BATTERY_STATS)
+            self.poll_soon()
+
+    def _init_instance(self) -> None:
+        """Accept requests from later launches on the control socket."""
+        if self._instance is None:
+            return
+        try:
+            self._instance.listen()
+        except OSError as exc:
+            logging.warning("Control socket not available: %s", exc)
+            return
+        self.tk.createfilehandler(self._instance.fileno(),
+                                  tk.READABLE,
+                                  lambda *_: self._on_control_socket())
+
+    def _on_control_socket(self) -> None:
+        """Answer a request waiting on the control socket."""
+        if self._instance:
+            self._instance.serve(self._on_request)
+
+    def _on_request(self, request: str) -> tuple[bool, str]:
+        """Handle a request from another launch. See `single_instance`."""
+        if request == RAISE:
+            self.deiconify()
+            self.lift()
+            self.focus_force()
+            return True, "Battery Boost is already running."
+        full_charge = request == 'fullcharge'
+        label = STATES[BatteryState.RECHARGE if full_charge else BatteryState.DEFAULT]['label_text']
+        if not self._profiles.busy and self._profiles.applied == full_charge:
+            return True, f"{label} (unchanged)."
+        # Reply first: the request may show the AC power dialog.
+        self.after_idle(lambda: self.request_profile(full_charge))
+        return True, f"Switching to: {label}."
+
+    def _on_focus_in(self, event: tk.Event) -> None:
+        """Reset to fast polling when the main window gains focus."""
+        if event.widget is self:
+            self.poll_soon()
+
+    def _on_map(self, event: tk.Event) -> None:
+        """Note that the main window was shown, e.g. restored from minimized."""
+        if event.widget is self:
+            self._mapped = True
+            self._update_visibility()
+
+    def _on_unmap(self, event: tk.Event) -> None:
+        """Note that the main window was minimized or moved off the workspace."""
+        if event.widget is self:
+            self._mapped = False
+            self._update_visibility()
+
+    def _on_visibility(self, event: tk.Event) -> None:
+        """Note whether the main window is completely covered by other windows."""
+        if event.widget is self:
+            self._obscured = event.state == 'VisibilityFullyObscured'
+            self._update_visibility()
+
+    def _update_visibility(self) -> None:
+        """Slow down polling while hidden, and refresh at once when shown."""
+        hidden = not self._mapped or self._obscured
+        if hidden == self._scheduler.hidden:
+            return
+        self._scheduler.hidden = hidden
+        logging.debug("Window %s", "hidden" if hidden else "shown")
+        if not hidden:
+            self.poll_soon()
 
     def ensure_ac_power(self) -> bool:
         """Ensure AC power is connected.
@@ -215,30 +375,142 @@ class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
 
     def refresh_battery_stats(self) -> None:
         """Periodically refresh the battery statistics."""
-        new_battery_stats = get_battery_stats()
-        current_battery_info = self.battery_stats['info']
-        new_battery_info = new_battery_stats['info']
+        with profiler.timed('refresh tick'):
+            self.request_battery_stats()
+        # noinspection PyTypeChecker
+        self._refresh_job = self.after(self._scheduler.interval_ms,
+                                       self.refresh_battery_stats)
+
+    def _fetch_battery_stats(self) -> BatteryInfo:
+        """Read battery statistics. Runs on the poller thread.
+
+        The `tlp-stat` fallback runs on the command engine, so that it is
+        cancelled if the app quits.
+        """
+        start = time.perf_counter()
+        with profiler.timed('fetch stats'):
+            # Wait for a profile change in progress, rather than race it.
+            result = self._engine.run_sync(self._profiles.read(
+                lambda: get_battery_stats_async(self._engine)))
+        self._poll_seconds = time.perf_counter() - start
+        return result
+
+    def poll_soon(self, refresh_now: bool = True) -> None:
+        """Return to fast polling after a change.
+
+        Args:
+            refresh_now: Refresh immediately. False if the caller has just
+                displayed fresh statistics.
+        """
+        if self._refresh_job is None:
+            return  # Periodic refresh not started yet.
+        self._scheduler.reset()
+        self.after_cancel(self._refresh_job)
+        if refresh_now:
+            self.refresh_battery_stats()
+        else:
+            # noinspection PyTypeChecker
+            self._refresh_job = self.after(self._scheduler.interval_ms,
+                                           self.refresh_battery_stats)
+
+    def request_battery_stats(self) -> None:
+        """Ask the background poller for fresh stats and watch for the result."""
+        if self._poller is None:
+            return
+        self._poller.request()
+        if self._collect_job is None:
+            # noinspection PyTypeChecker
+            self._collect_job = self.after(RESULT_CHECK_INTERVAL_MS,
+                                           self._collect_battery_stats)
+
+    def _collect_battery_stats(self) -> None:
+        """Apply the latest poll result, re-checking while a fetch is pending."""
+        self._collect_job = None
+        if self._poller is None:
+            return
+        with profiler.timed('collect tick'):
+            new_battery_stats = self._poller.get_result()
+            if new_battery_stats is not None:
+                self.show_battery_stats(new_battery_stats)
+        if self._poller.busy:
+            # noinspection PyTypeChecker
+            self._collect_job = self.after(RESULT_CHECK_INTERVAL_MS,
+                                           self._collect_battery_stats)
+
+    def show_battery_stats(self,
+                           new_battery_stats: BatteryInfo,
+                           force_redraw: bool = False) -> None:
+        """Update the button and text widget from new battery stats.
+
+        Args:
+            new_battery_stats: Freshly read battery statistics.
+            force_redraw: Render the text even if no displayed field changed,
+                e.g. after a profile change.
+        """
         # Handle updating button appearance on battery discharge.
         self.update_button(new_battery_stats['discharging'])
-        # Update text widget info.
-        if current_battery_info != new_battery_info:
+        # Compare field by field; only displayed fields require a redraw.
+        diff = diff_snapshots(self.battery_stats['batteries'],
+                              new_battery_stats['batteries'])
+        if diff is None or self.battery_stats['message'] != new_battery_stats['message']:
+            changed = displayed = True
+        else:
+            changed = bool(diff)
+            displayed = any(field in DISPLAYED_FIELDS
+                            for fields in diff.values()
+                            for field in fields)
+        redraw = displayed
+        if changed:
             self.battery_stats = new_battery_stats
-            self.write_stats(new_battery_info)
-
-        # noinspection PyTypeChecker
-        self._refresh_job = self.after(REFRESH_INTERVAL_MS, self.refresh_battery_stats)
+        # The estimate may change even when the stats do not.
+        self._estimator.add(new_battery_stats)
+        eta_text = self._estimate_text()
+        if eta_text != self._eta_text:
+            self._eta_text = eta_text
+            redraw = True
+        if redraw or force_redraw:
+            self.render_stats()
+        # Power and energy readings jitter on every read, so only a displayed
+        # change holds the polling rate.
+        self._scheduler.record(new_battery_stats, displayed)
+        if self._history:
+            self._history.record(new_battery_stats)
+        if self._metrics:
+            self._metrics.update(new_battery_stats,
+                                 self.ui_state is BatteryState.RECHARGE,
+                                 self._poll_seconds)
+        if self._trace.enabled:
+            self.update_idletasks()
+            self._trace.mark('first stats')
+            self._trace.report()
+
+    def _estimate_text(self) -> str:
+        """Return the time to full/threshold/empty, or '' if unknown."""
+        target = charge_target(self.battery_stats,
+                               self.ui_state is BatteryState.RECHARGE)
+        seconds = self._estimator.seconds_to(target)
+        return "" if seconds is None else format_eta(seconds, target)
+
+    def stats_segments(self) -> list[Segment]:
+        """Return the displayed text: profile action, battery stats and estimate."""
+        segments: list[Segment] = [(STATES[self.ui_state]['action'], 'action')]
+        segments += battery_info_segments(self.battery_stats)
+        if self._eta_text:
+            segments += [("\n", None), (self._eta_text, 'eta'), ("\n", None)]
+        return segments
 
     def update_button(self, is_discharging: bool) -> None:
         """Update button appearance to match battery status."""
-        prev_btn_style = self.button.cget("style")
         if is_discharging:
             new_style = 'Discharge.TButton'
         elif self.ui_state is BatteryState.RECHARGE:
             new_style = 'Recharge.TButton'
         else:
             new_style = 'Default.TButton'
-        if new_style != prev_btn_style:
+        # Compare with the cached style, avoiding a Tcl round trip per refresh.
+        if new_style != self._button_style:
             self.button.configure(style=new_style)
+            self._button_style = new_style
 
     def quit_on_error(self, error_message: str, title: str = "Error") -> NoReturn:
         """Display Error dialog and quit."""
@@ -251,11 +523,34 @@ class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
         Args:
             status: Optional exit code or message.
         """
-        if self._refresh_job:
+        for job in (self._refresh_job, self._collect_job):
+            if job:
+                try:
+                    self.after_cancel(job)
+                except (tk.TclError, RuntimeError):
+                    pass  # Just quit
+        if self._poller:
+            self._poller.stop()
+        profiler.stop()
+        # Cancel commands in flight rather than wait for them.
+        self._engine.shutdown()
+        if self._history:
+            self._history.close()
+        if self._metrics:
+            self._metrics.flush()
+        if self._instance:
+            if self._instance.listening:
+                try:
+                    self.tk.deletefilehandler(self._instance.fileno())
+                except tk.TclError:
+                    pass  # Just quit
+            self._instance.close()
+        if self._uevents:
             try:
-                self.after_cancel(self._refresh_job)
-            except (tk.TclError, RuntimeError):
+                self.tk.deletefilehandler(self._uevents.fileno())
+            except tk.TclError:
                 pass  # Just quit
+            self._uevents.close()
         self.destroy()
         sys.exit(status)
 
@@ -281,32 +576,67 @@ class App(tk.Tk):  # pylint: disable=too-many-instance-attributes
 
         self.top_label.configure(style=top_label_style, text=state['label_text'])
         self.instruction_label.configure(style=instruction_label_style)
-        self.button.configure(style=button_style, text=state['button_text'])
+        # The button offers to undo the profile last requested, even if a
+        # change to it is still pending.
+        target = BatteryState.RECHARGE if self._profiles.target else BatteryState.DEFAULT
+        self.button.configure(style=button_style, text=STATES[target]['button_text'])
+        self._button_style = button_style
 
         # Text box (tk widget does not have ttk style).
         self.text_box.config(background=background, foreground=self.theme['text'])
 
     def toggle_state(self) -> None:
-        """Switch between default and full-charge profiles and update the UI."""
-        if not tlp_toggle_state(self, self.ui_state):
+        """Switch between default and full-charge profiles.
+
+        Requests the opposite of the profile last requested, so that clicks
+        made while a change is pending or running are not lost.
+        """
+        self.request_profile(not self._profiles.target)
+
+    def request_profile(self, full_charge: bool) -> None:
+        """Request a profile, applied in order on the command engine.
+
+        Requests made before the change starts (see `TOGGLE_DEBOUNCE_MS`) or
+        while it runs are collapsed into the profile finally requested. The
+        button shows the requested profile at once; the rest of the UI is
+        updated when the change completes.
+        """
+        if not toggle_allowed(self, full_charge, self._fast_toggle):
+            return
+        future = self._profiles.request(full_charge)
+        target = BatteryState.RECHARGE if full_charge else BatteryState.DEFAULT
+        self.button.configure(text=STATES[target]['button_text'])
+        if future is not None:
+            self._toggle_future = future
+            deliver(self, future, self._toggle_done)
+
+    def _toggle_done(self, future: Future[ProfileResult]) -> None:
+        """Update the UI once a profile has been applied."""
+        if self._toggle_future is future:
+            self._toggle_future = None
+        try:
+            result = future.result()
+        except (OSError, subprocess.SubprocessError) as exc:
+            self.apply_state()  # The target was reset to the applied profile.
+            toggle_failed(self, exc)
             return
-        # Flip UI state
-        self.ui_state = (BatteryState.DEFAULT
-                         if self.ui_state == BatteryState.RECHARGE
-                         else BatteryState.RECHARGE)
+        if result.battery_info is None:
+            # The requests cancelled out; nothing was changed.
+            self.apply_state()
+            return
+        self.ui_state = (BatteryState.RECHARGE if result.full_charge
+                         else BatteryState.DEFAULT)
         self.apply_state()
 
-        # Update text widget.
-        self.battery_stats = get_battery_stats()
-        self.write_stats(self.battery_stats['info'])
+        # A poll started before the toggle would show the old thresholds.
+        if self._poller:
+            self._poller.discard()
+        # Stats were read after the toggle; the action text always changes.
+        self.show_battery_stats(result.battery_info, force_redraw=True)
+        self.poll_soon(refresh_now=False)
         return
 
-    def write_stats(self, stats: str) -> None:
-        """Update the text area with the current TLP battery stats."""
-        stats = STATES[self.ui_state]['action'] + stats
-        # noinspection PyTypeChecker
-        self.text_box.config(state=tk.NORMAL)
-        self.text_box.delete('1.0', tk.END)
-        self.text_box.insert(tk.END, stats)
-        # noinspection PyTypeChecker
-        self.text_box.config(state=tk.DISABLED)
+    def render_stats(self) -> None:
+        """Update the text area, redrawing only the values that changed."""
+        with profiler.timed('render'):
+            self.text_box.show(self.stats_segments())
@@ -9,6 +9,8 @@ import subprocess
 from tkinter import simpledialog, messagebox
 from typing import TYPE_CHECKING
 
+from battery_boost.shell_commands import start_privileged_helper
+
 if TYPE_CHECKING:
     from battery_boost.app import App
 
@@ -16,7 +18,9 @@ if TYPE_CHECKING:
 def authenticate(_parent: App) -> None:
     """Prompt user for sudo password and validate.
 
-    Runs `sudo -v` to cache credentials for subsequent commands.
+    Runs `sudo -v` to cache credentials, then starts the persistent privileged
+    helper that runs subsequent TLP commands. If the helper cannot be started,
+    commands fall back to `sudo` with the cached credentials.
     Retries up to three times before exiting the program.
 
     Exits program if authentication fails.
@@ -47,6 +51,7 @@ def authenticate(_parent: App) -> None:
                            timeout=20,  # Unlikely, but better than hanging.
                            check=True)
             _password = None  # Overwrite password immediately.
+            start_privileged_helper()
             return
         except FileNotFoundError:
             _parent.quit_on_error("sudo not found on this system.")
@@ -0,0 +1,338 @@
+"""Interchangeable sources of battery statistics.
+
+A backend reads battery statistics into a `BatteryInfo`:
+
+| Backend          | Source                                    |
+|------------------|-------------------------------------------|
+| `SysfsBackend`   | `/sys/class/power_supply`, no subprocess  |
+| `TlpStatBackend` | `sudo tlp-stat -b`, via the root helper    |
+| `FakeBackend`    | Fixed statistics held in memory           |
+
+On the first read, `read_battery_info()` probes the configured backends
+(`use_backends()`), timing each read, and selects the fastest one that gives
+complete data. Backends that spawn a process are only probed if no in-process
+backend gives complete data, so that probing never runs `tlp-stat` needlessly.
+The statistics read by the probe are returned, so probing costs no extra read.
+If the selected backend later fails, the backends are probed again.
+
+The statistics read after a profile change also come from the selected backend
+(`read_after_async()`).
+
+Set `constants.DEBUG` to see the probe results in the log.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, NamedTuple, Protocol
+
+from battery_boost.battery import BatteryInfo, message_info
+from battery_boost.power_supply import SysfsUnavailableError, read_battery_stats
+from battery_boost.shell_commands import (
+    TlpCommandError,
+    run_privileged_async,
+    tlp_get_stats,
+    tlp_get_stats_async
+)
+from battery_boost.tlp_parser import parse_tlp_stats
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from battery_boost.command_engine import CommandEngine
+
+
+class BackendError(Exception):
+    """Raised when a backend cannot provide battery statistics."""
+
+
+class BatteryBackend(Protocol):
+    """A source of battery statistics.
+
+    Attributes:
+        name: Short name for log messages, e.g. 'sysfs'.
+        spawns_process: True if a read runs a subprocess, making it much
+            slower than in-process backends.
+    """
+    name: str
+    spawns_process: bool
+
+    def read(self) -> BatteryInfo:
+        """Read battery statistics.
+
+        Raises:
+            BackendError: If the statistics are not available.
+        """
+
+    async def read_async(self, engine: CommandEngine) -> BatteryInfo:
+        """Coroutine variant of `read()`, running any subprocess on `engine`.
+
+        Raises:
+            BackendError: If the statistics are not available.
+        """
+
+
+class SysfsBackend:
+    """Read `/sys/class/power_supply` directly (see `power_supply`)."""
+    name = 'sysfs'
+    spawns_process = False
+
+    def __init__(self, base: Path | None = None) -> None:
+        """Create the backend.
+
+        Args:
+            base: The power supply class directory. Defaults to
+                `power_supply.POWER_SUPPLY_PATH`.
+        """
+        self.base = base
+
+    def read(self) -> BatteryInfo:
+        """Read battery statistics from sysfs.
+
+        Raises:
+            BackendError: If no battery exposes charge thresholds in sysfs.
+        """
+        try:
+            return read_battery_stats(self.base)
+        except SysfsUnavailableError as exc:
+            raise BackendError(str(exc)) from exc
+
+    async def read_async(self, _engine: CommandEngine) -> BatteryInfo:
+        """As `read()`; sysfs reads do not block for long."""
+        return self.read()
+
+
+class TlpStatBackend:
+    """Parse the output of `sudo tlp-stat -b`."""
+    name = 'tlp-stat'
+    spawns_process = True
+
+    def read(self) -> BatteryInfo:
+        """Run `tlp-stat -b` and parse its output.
+
+        Raises:
+            BackendError: If the command fails.
+        """
+        try:
+            return parse_tlp_stats(tlp_get_stats())
+        except TlpCommandError as exc:
+            raise BackendError(str(exc)) from exc
+
+    async def read_async(self, engine: CommandEngine) -> BatteryInfo:
+        """As `read()`, running `tlp-stat` on `engine`."""
+        try:
+            return parse_tlp_stats(await tlp_get_stats_async(engine))
+        except TlpCommandError as exc:
+            raise BackendError(str(exc)) from exc
+
+
+class FakeBackend:
+    """Return fixed statistics, for tests and benchmarks."""
+    name = 'fake'
+    spawns_process = False
+
+    def __init__(self, *infos: BatteryInfo, delay: float = 0.0) -> None:
+        """Create the backend.
+
+        Args:
+            *infos: Statistics returned by successive reads; the last is
+                repeated. With none, reads raise `BackendError`.
+            delay: Seconds each read takes, to simulate a slow source.
+        """
+        self._infos = list(infos)
+        self.delay = delay
+        self.reads = 0
+
+    def read(self) -> BatteryInfo:
+        """Return the next statistics.
+
+        Raises:
+            BackendError: If no statistics were given.
+        """
+        if self.delay:
+            time.sleep(self.delay)
+        self.reads += 1
+        if not self._infos:
+            raise BackendError("No fake battery statistics.")
+        return self._infos.pop(0) if len(self._infos) > 1 else self._infos[0]
+
+    async def read_async(self, _engine: CommandEngine) -> BatteryInfo:
+        """As `read()`."""
+        return self.read()
+
+
+def is_complete(battery_info: BatteryInfo) -> bool:
+    """Return True if every battery reports its charge and a charge threshold."""
+    return bool(battery_info['batteries']) and all(
+        battery.charge is not None and (battery.start is not None or battery.end is not None)
+        for battery in battery_info['batteries'])
+
+
+class ProbeResult(NamedTuple):
+    """Outcome of probing one backend.
+
+    Attributes:
+        backend: The backend probed.
+        seconds: Time taken by the read.
+        battery_info: The statistics read, or None if the read failed.
+        error: Why the read failed, or None.
+    """
+    backend: BatteryBackend
+    seconds: float
+    battery_info: BatteryInfo | None
+    error: str | None = None
+
+    @property
+    def complete(self) -> bool:
+        """True if the read gave complete data."""
+        return self.battery_info is not None and is_complete(self.battery_info)
+
+
+DEFAULT_BACKENDS: tuple[BatteryBackend, ...] = (SysfsBackend(), TlpStatBackend())
+"""Backends probed unless `use_backends()` is called."""
+
+
+class _Selection:  # pylint: disable=too-few-public-methods
+    """The backends to probe, and the one selected, shared by all threads."""
+    backends: tuple[BatteryBackend, ...] = DEFAULT_BACKENDS
+    backend: BatteryBackend | None = None
+
+
+def use_backends(*backends: BatteryBackend) -> None:
+    """Replace the backends to probe, e.g. with a `FakeBackend` in tests.
+
+    With no arguments, restore `DEFAULT_BACKENDS`. The next read probes again.
+    Statistics already cached by `helper_functions.get_battery_stats()` are
+    not dropped; see `query_cache`.
+    """
+    _Selection.backends = backends or DEFAULT_BACKENDS
+    _Selection.backend = None
+
+
+def selected_backend() -> BatteryBackend | None:
+    """Return the backend chosen by the last probe, or None if not probed yet."""
+    return _Selection.backend
+
+
+def _skip(backend: BatteryBackend, results: list[ProbeResult]) -> bool:
+    """Return True if probing `backend` can only find a slower complete source."""
+    return backend.spawns_process and any(result.complete for result in results)
+
+
+def _timed_error(backend: BatteryBackend, start: float, exc: BackendError) -> ProbeResult:
+    """Record a failed read."""
+    return ProbeResult(backend, time.perf_counter() - start, None, str(exc))
+
+
+def _choose(results: list[ProbeResult]) -> BatteryInfo:
+    """Select a backend from probe results and return its statistics.
+
+    Chooses the fastest backend with complete data, else the fastest with any
+    battery data. If none has battery data, nothing is selected and the last
+    result (usually `tlp-stat`'s, explaining what is wrong) is returned.
+    """
+    for result in results:
+        logging.debug("Battery backend %s: %.1f ms, %s",
+                      result.backend.name,
+                      result.seconds * 1000,
+                      result.error or ('complete' if result.complete else 'incomplete'))
+    usable = ([result for result in results if result.complete]
+              or [result for result in results
+                  if result.battery_info is not None and result.battery_info['batteries']])
+    if usable:
+        best = min(usable, key=lambda result: result.seconds)
+        _Selection.backend = best.backend
+        logging.debug("Using battery backend %s", best.backend.name)
+        assert best.battery_info is not None
+        return best.battery_info
+    _Selection.backend = None
+    if not results:
+        return message_info("Error: No battery backend configured.")
+    last = results[-1]
+    return last.battery_info or message_info(f"Error: {last.error}")
+
+
+def probe(backends: tuple[BatteryBackend, ...] | None = None) -> BatteryInfo:
+    """Probe backends, select one, and return the statistics it read.
+
+    Args:
+        backends: The backends to probe, in order. Defaults to those set by
+            `use_backends()`.
+    """
+    results: list[ProbeResult] = []
+    for backend in backends or _Selection.backends:
+        if _skip(backend, results):
+            continue
+        start = time.perf_counter()
+        try:
+            battery_info = backend.read()
+        except BackendError as exc:
+            results.append(_timed_error(backend, start, exc))
+            continue
+        results.append(ProbeResult(backend, time.perf_counter() - start, battery_info))
+    return _choose(results)
+
+
+async def probe_async(engine: CommandEngine,
+                      backends: tuple[BatteryBackend, ...] | None = None) -> BatteryInfo:
+    """Coroutine variant of `probe()`."""
+    results: list[ProbeResult] = []
+    for backend in backends or _Selection.backends:
+        if _skip(backend, results):
+            continue
+        start = time.perf_counter()
+        try:
+            battery_info = await backend.read_async(engine)
+        except BackendError as exc:
+            results.append(_timed_error(backend, start, exc))
+            continue
+        results.append(ProbeResult(backend, time.perf_counter() - start, battery_info))
+    return _choose(results)
+
+
+def read_battery_info() -> BatteryInfo:
+    """Read battery statistics from the selected backend, probing if needed.
+
+    Errors are returned as a message for display, as for `tlp-stat` failures.
+    """
+    backend = _Selection.backend
+    if backend is not None:
+        try:
+            return backend.read()
+        except BackendError as exc:
+            logging.debug("Battery backend %s failed: %s", backend.name, exc)
+    return probe()
+
+
+async def read_battery_info_async(engine: CommandEngine) -> BatteryInfo:
+    """Coroutine variant of `read_battery_info()`."""
+    backend = _Selection.backend
+    if backend is not None:
+        try:
+            return await backend.read_async(engine)
+        except BackendError as exc:
+            logging.debug("Battery backend %s failed: %s", backend.name, exc)
+    return await probe_async(engine)
+
+
+async def read_after_async(engine: CommandEngine, operation: str) -> BatteryInfo:
+    """Run a privileged operation, then read battery statistics.
+
+    With the `tlp-stat` backend selected, the operation and `tlp-stat -b` run
+    in a single privileged round trip. Otherwise the statistics are read by
+    the selected backend, probing if none is selected yet.
+
+    Args:
+        engine: The engine to run commands on.
+        operation: A privileged helper operation, e.g. 'fullcharge'.
+
+    Raises:
+        subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError:
+            As `shell_commands.run_privileged()`.
+    """
+    if isinstance(_Selection.backend, TlpStatBackend):
+        result = await run_privileged_async(engine, operation, 'stats')
+        return parse_tlp_stats(result.stdout)
+    await run_privileged_async(engine, operation)
+    return await read_battery_info_async(engine)
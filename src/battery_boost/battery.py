@@ -0,0 +1,164 @@
+"""Typed battery model shared by the sysfs and `tlp-stat` backends."""
+
+from dataclasses import dataclass, fields
+from typing import TypedDict
+
+UNKNOWN = "???"
+
+Segment = tuple[str, str | None]
+"""A piece of displayed text and its field key, or None for fixed text."""
+
+
+@dataclass(frozen=True, slots=True)
+class BatterySnapshot:  # pylint: disable=too-many-instance-attributes
+    """Point-in-time statistics for one battery.
+
+    Numeric fields are None when the value is not available.
+
+    Attributes:
+        name: Battery name, e.g. 'BAT0'.
+        status: Charging status, e.g. 'Charging', 'Discharging', 'Not charging'.
+        start: Start charge threshold (%).
+        end: End (stop) charge threshold (%).
+        charge: Current charge as a percentage of full capacity.
+        capacity: Full capacity as a percentage of design capacity.
+        energy_now: Remaining energy (Wh).
+        energy_full: Energy when full (Wh).
+        power: Present charge or discharge rate (W).
+    """
+    name: str
+    status: str | None = None
+    start: int | None = None
+    end: int | None = None
+    charge: float | None = None
+    capacity: float | None = None
+    energy_now: float | None = None
+    energy_full: float | None = None
+    power: float | None = None
+
+    @property
+    def discharging(self) -> bool:
+        """True if the battery is discharging."""
+        return (self.status or '').lower() == 'discharging'
+
+    @property
+    def charging(self) -> bool:
+        """True if the battery is charging."""
+        return (self.status or '').lower() == 'charging'
+
+
+DISPLAYED_FIELDS = ('status', 'start', 'end', 'charge', 'capacity')
+"""Snapshot fields shown in the GUI."""
+
+
+class BatteryInfo(TypedDict):
+    """Battery info object.
+
+    Attributes:
+        discharging: True if any battery is discharging.
+        charging: True if any battery is charging.
+        batteries: Snapshot of each battery.
+        message: Error or notice shown when there is no battery data, else ''.
+    """
+    discharging: bool
+    charging: bool
+    batteries: tuple[BatterySnapshot, ...]
+    message: str
+
+
+def battery_info(batteries: tuple[BatterySnapshot, ...]) -> BatteryInfo:
+    """Build a `BatteryInfo` from battery snapshots."""
+    if not batteries:
+        return message_info("No battery data found.")
+    return {'discharging': any(battery.discharging for battery in batteries),
+            'charging': any(battery.charging for battery in batteries),
+            'batteries': batteries,
+            'message': ''}
+
+
+def message_info(message: str) -> BatteryInfo:
+    """Build a `BatteryInfo` carrying only an error or notice."""
+    return {'discharging': False, 'charging': False, 'batteries': (), 'message': message}
+
+
+def changed_fields(old: BatterySnapshot, new: BatterySnapshot) -> tuple[str, ...]:
+    """Return the names of fields whose values differ between two snapshots."""
+    return tuple(field.name for field in fields(BatterySnapshot)
+                 if getattr(old, field.name) != getattr(new, field.name))
+
+
+def diff_snapshots(old: tuple[BatterySnapshot, ...],
+                   new: tuple[BatterySnapshot, ...]
+                   ) -> dict[str, tuple[str, ...]] | None:
+    """Compare two sets of battery snapshots field by field.
+
+    Args:
+        old: Previous snapshots.
+        new: Current snapshots.
+
+    Returns:
+        Mapping of battery name to changed field names, for batteries with
+        changes only (empty if nothing changed), or None if batteries were
+        added, removed or reordered.
+    """
+    if [battery.name for battery in old] != [battery.name for battery in new]:
+        return None
+    diff = {}
+    for old_battery, new_battery in zip(old, new):
+        if old_battery != new_battery:
+            diff[new_battery.name] = changed_fields(old_battery, new_battery)
+    return diff
+
+
+def format_value(value: float | int | str | None) -> str:
+    """Format a snapshot value for display."""
+    if value is None:
+        return UNKNOWN
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+def battery_segments(battery: BatterySnapshot) -> list[Segment]:
+    """Return a battery's text block as segments, keyed by field.
+
+    Field keys are `<battery name>-<field>`, e.g. 'BAT0-charge'.
+    """
+    def field(name: str) -> Segment:
+        return format_value(getattr(battery, name)), f"{battery.name}-{name}"
+
+    return [("Current Status: ", None), field('status'),
+            (f"\n\n{battery.name}:\n  Start threshold: ", None), field('start'),
+            ("%\n  End threshold: ", None), field('end'),
+            ("%\n  Current Charge: ", None), field('charge'),
+            ("% of ", None), field('capacity'),
+            ("%\n", None)]
+
+
+def battery_info_segments(info: BatteryInfo) -> list[Segment]:
+    """Return all batteries, or the message if there is no battery data, as segments."""
+    if not info['batteries']:
+        return [(info['message'], 'message')]
+    segments: list[Segment] = []
+    for battery in info['batteries']:
+        if segments:
+            segments.append(("\n", None))
+        segments += battery_segments(battery)
+    return segments
+
+
+def format_battery_str(battery: BatterySnapshot) -> str:
+    """Format battery info into a readable text block.
+
+    Args:
+        battery: Battery snapshot.
+
+    Returns:
+        str: Formatted string representing the battery.
+    """
+    return ''.join(text for text, _ in battery_segments(battery))
+
+
+def format_battery_info(info: BatteryInfo) -> str:
+    """Format all batteries, or the message if there is no battery data."""
+    return ''.join(text for text, _ in battery_info_segments(info))
@@ -0,0 +1,122 @@
+"""Headless command-line interface for Battery Boost.
+
+Provides `status`, `fullcharge` and `default` commands for scripts and status
+bars. Nothing here imports Tkinter, so these commands start much faster than
+the GUI. If the GUI is running, `fullcharge` and `default` are sent to it
+(see `single_instance`), so that it stays in step with the profile.
+
+With `--metrics FILE`, each command also writes battery metrics for the
+Prometheus textfile collector, e.g. from a systemd timer.
+"""
+
+import dataclasses
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from battery_boost.battery import BatteryInfo, format_battery_info
+from battery_boost.helper_functions import get_battery_stats, on_ac_power
+from battery_boost.metrics import MetricsExporter
+from battery_boost.shell_commands import revoke_permissions, run_privileged
+from battery_boost.single_instance import send_request
+from battery_boost.tlp_config import full_charge_applied
+
+COMMANDS = ('status', 'fullcharge', 'default')
+"""Available headless commands."""
+
+
+def battery_info_json(battery_info: BatteryInfo) -> str:
+    """Serialize battery statistics as JSON."""
+    return json.dumps({
+        'discharging': battery_info['discharging'],
+        'charging': battery_info['charging'],
+        'message': battery_info['message'],
+        'batteries': [dataclasses.asdict(battery)
+                      for battery in battery_info['batteries']],
+    })
+
+
+def run_command(command: str,
+                as_json: bool = False,
+                metrics_path: Path | None = None) -> int:
+    """Run a headless command.
+
+    Args:
+        command: One of `COMMANDS`.
+        as_json: Print status as JSON rather than text.
+        metrics_path: Write battery metrics to this `.prom` file afterwards.
+
+    Returns:
+        int: Process exit status.
+    """
+    if command == 'status':
+        return _status(as_json, metrics_path)
+    status = _set_profile(command)
+    if metrics_path and status == 0:
+        _write_metrics(metrics_path, command == 'fullcharge')
+    return status
+
+
+def _write_metrics(path: Path, full_charge: bool | None = None) -> BatteryInfo:
+    """Read battery statistics and write them as metrics. Returns the statistics.
+
+    Args:
+        path: The `.prom` file.
+        full_charge: The profile just applied, or None to infer it from the
+            thresholds.
+    """
+    start = time.perf_counter()
+    battery_info = get_battery_stats()
+    poll_seconds = time.perf_counter() - start
+    if full_charge is None:
+        full_charge = full_charge_applied(battery_info)
+    if not MetricsExporter(path).update(battery_info, full_charge, poll_seconds):
+        print(f"Could not write metrics to {path}", file=sys.stderr)
+    return battery_info
+
+
+def _status(as_json: bool, metrics_path: Path | None = None) -> int:
+    """Print the current battery statistics."""
+    if metrics_path:
+        battery_info = _write_metrics(metrics_path)
+    else:
+        battery_info = get_battery_stats()
+    if as_json:
+        print(battery_info_json(battery_info))
+    else:
+        print(format_battery_info(battery_info))
+    return 0 if battery_info['batteries'] else 1
+
+
+def _set_profile(command: str) -> int:
+    """Apply the full-charge or default TLP profile. May prompt for sudo.
+
+    If the GUI is running, it applies the profile instead.
+    """
+    if command == 'fullcharge':
+        try:
+            if not on_ac_power():
+                print("Full charge mode requires AC power.", file=sys.stderr)
+                return 1
+        except RuntimeError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+    reply = send_request(command)
+    if reply is not None:
+        print(reply.get('message', ''), file=sys.stdout if reply.get('ok') else sys.stderr)
+        return 0 if reply.get('ok') else 1
+    try:
+        result = run_privileged('fullcharge' if command == 'fullcharge' else 'start')
+    except subprocess.CalledProcessError as exc:
+        print(f"TLP command failed: {exc.returncode}:\n{exc.stderr or exc}",
+              file=sys.stderr)
+        return 1
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        print(f"System error while running TLP command: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        revoke_permissions()
+    print(result.stdout, end='')
+    return 0
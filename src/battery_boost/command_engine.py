@@ -0,0 +1,174 @@
+"""Asyncio engine for running commands without blocking the GUI.
+
+Commands run with `asyncio.create_subprocess_exec` on an event loop in a
+background thread. Slow commands overlap instead of queueing behind each other,
+up to a concurrency limit, and `CommandEngine.shutdown()` cancels work in
+flight (killing its processes) rather than waiting for it to time out.
+
+Coroutines are submitted from any thread with `CommandEngine.submit()`, which
+returns a `concurrent.futures.Future`. `deliver()` hands the result back to the
+Tk main loop by polling the future from `after()` callbacks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import subprocess
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, TypeVar
+
+from battery_boost.constants import RESULT_CHECK_INTERVAL_MS
+
+if TYPE_CHECKING:
+    import tkinter as tk
+
+T = TypeVar('T')
+
+DEFAULT_CONCURRENCY = 4
+"""Maximum number of commands (or blocking calls) running at once."""
+
+DEFAULT_TIMEOUT = 5.0
+"""Default per-command timeout in seconds. TLP commands are expected to be fast."""
+
+_SHUTDOWN_TIMEOUT = 1.0
+
+
+class CommandEngine:
+    """Run commands and coroutines on an asyncio loop in a background thread."""
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        """Start the event loop thread.
+
+        Args:
+            max_concurrency: Maximum number of commands running at once.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='command-engine',
+                                        daemon=True)
+        self._thread.start()
+
+    async def run(self,
+                  argv: list[str],
+                  timeout: float = DEFAULT_TIMEOUT,
+                  check: bool = True) -> subprocess.CompletedProcess[str]:
+        """Run a command and capture its output, like `subprocess.run()`.
+
+        The command's stdin is /dev/null, so `sudo` cannot prompt for a
+        password. If the command times out or is cancelled, it is killed.
+
+        Raises:
+            subprocess.CalledProcessError: If `check` and the command exits nonzero.
+            subprocess.TimeoutExpired: If the command times out.
+            OSError: If the command cannot be run.
+        """
+        async with self._semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await _kill(process)
+                raise subprocess.TimeoutExpired(argv, timeout)  # pylint: disable=raise-missing-from
+            except asyncio.CancelledError:
+                await _kill(process)
+                raise
+        result = subprocess.CompletedProcess(argv,
+                                             process.returncode or 0,
+                                             stdout.decode(errors='replace'),
+                                             stderr.decode(errors='replace'))
+        if check:
+            result.check_returncode()
+        return result
+
+    async def call(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a blocking function in a worker thread, within the concurrency limit.
+
+        Cancellation stops waiting for the function, but cannot interrupt it.
+        """
+        async with self._semaphore:
+            return await self._loop.run_in_executor(None, func, *args)
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """Schedule a coroutine on the engine's loop. Safe to call from any thread.
+
+        Raises:
+            RuntimeError: If the engine has been shut down.
+        """
+        with self._lock:
+            if self._closed:
+                coro.close()
+                raise RuntimeError("Command engine is shut down.")
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run_sync(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the engine's loop and wait for its result.
+
+        Must not be called from the engine's own thread.
+
+        Raises:
+            concurrent.futures.CancelledError: If the engine shuts down first.
+        """
+        return self.submit(coro).result()
+
+    def shutdown(self) -> None:
+        """Cancel work in flight, killing its processes, and stop the loop."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(_cancel_all(), self._loop).result(
+                timeout=_SHUTDOWN_TIMEOUT * 2)
+        except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError):
+            pass  # Just quit.
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=_SHUTDOWN_TIMEOUT)
+
+
+async def _cancel_all() -> None:
+    """Cancel all other tasks and wait for them to kill their processes."""
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.wait(tasks, timeout=_SHUTDOWN_TIMEOUT)
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    """Kill a process and reap it."""
+    try:
+        process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass  # Already gone, or running as another user (e.g. under sudo).
+    try:
+        await asyncio.wait_for(process.wait(), _SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+
+
+def deliver(widget: tk.Misc,
+            future: concurrent.futures.Future[T],
+            callback: Callable[[concurrent.futures.Future[T]], None],
+            interval_ms: int = RESULT_CHECK_INTERVAL_MS) -> None:
+    """Call `callback(future)` on the Tk main loop once `future` is done.
+
+    Args:
+        widget: Any widget of the application, used for `after()`.
+        future: Future returned by `CommandEngine.submit()`.
+        callback: Called with the finished future; use `future.result()`.
+        interval_ms: How often to check the future.
+    """
+    def check() -> None:
+        if future.done():
+            callback(future)
+        else:
+            widget.after(interval_ms, check)
+    check()
@@ -8,12 +8,55 @@ DEBUG = False
 """Enable debug logging (True/False)."""
 
 
-REFRESH_INTERVAL_MS: int = 1_000
-"""Check TLP battery statistics every second.
-Must be frequent enough to catch changes in charging status.
+# Polling policy defaults (see `scheduler.PollPolicy`).
+
+POLL_MIN_INTERVAL_MS: int = 1_000
+"""Poll every second immediately after a toggle, AC change or window focus."""
+
+
+POLL_MAX_CHARGING_MS: int = 10_000
+"""Longest interval between polls while a battery is charging."""
+
+
+POLL_MAX_DISCHARGING_MS: int = 30_000
+"""Longest interval between polls while a battery is discharging."""
+
+
+POLL_MAX_FULL_MS: int = 60_000
+"""Longest interval between polls while on AC power and not charging."""
+
+
+POLL_BACKOFF_FACTOR: float = 2.0
+"""Multiply the polling interval by this factor after each unchanged poll."""
+
+
+POLL_HIDDEN_MS: int = 300_000
+"""Interval between polls while the window is minimized or hidden.
+Kernel uevents still trigger a refresh while hidden.
 """
 
 
+STATS_CACHE_TTL_S: float = 0.5
+"""Reuse battery statistics read within this many seconds (see `query_cache`).
+Shorter than `POLL_MIN_INTERVAL_MS`, so scheduled polls read fresh values; a
+refresh on focus or a uevent may reuse the last read.
+"""
+
+
+TLP_STATUS_CACHE_TTL_S: float = 5.0
+"""Reuse the TLP service status checked within this many seconds."""
+
+
+TOGGLE_DEBOUNCE_MS: int = 150
+"""Wait this long after a click for further clicks before changing profile.
+A double click then changes nothing (see `profile_queue`).
+"""
+
+
+RESULT_CHECK_INTERVAL_MS: int = 50
+"""Check for background poll results this often while a fetch is in progress."""
+
+
 # UI Themes
 
 class ThemeName(Enum):
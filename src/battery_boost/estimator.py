@@ -0,0 +1,155 @@
+"""Time-to-full and time-to-empty estimation from recent samples.
+
+Keeps a rolling time window of charge samples and fits a least-squares line
+(charge against time) to estimate the charge rate. The fit is maintained with
+running sums, so adding or expiring a sample costs O(1) and the window is not
+re-scanned on each sample.
+"""
+
+import time
+from collections import deque
+
+from battery_boost.battery import BatteryInfo
+
+WINDOW_SECONDS = 600.0
+"""Only samples from the last 10 minutes contribute to the charge rate."""
+
+MIN_SAMPLES = 3
+MIN_SPAN_SECONDS = 60.0
+"""Minimum samples, and time covered by them, before an estimate is given."""
+
+
+def combined_charge(battery_info: BatteryInfo) -> float | None:
+    """Return the charge of all batteries combined, as a percentage.
+
+    Batteries are weighted by their full energy where available, otherwise
+    the plain mean charge is used.
+    """
+    batteries = battery_info['batteries']
+    energies = [(b.energy_now, b.energy_full) for b in batteries]
+    if energies and all(now is not None and full for now, full in energies):
+        total_full = sum(full for _, full in energies)  # type: ignore[misc]
+        return 100 * sum(now for now, _ in energies) / total_full  # type: ignore[misc]
+    charges = [b.charge for b in batteries if b.charge is not None]
+    return sum(charges) / len(charges) if charges else None
+
+
+class ChargeEstimator:  # pylint: disable=too-many-instance-attributes
+    """Estimate the charge rate from a rolling window of samples."""
+
+    def __init__(self, window: float = WINDOW_SECONDS) -> None:
+        self.window = window
+        self._samples: deque[tuple[float, float]] = deque()
+        self._origin = 0.0  # Times are stored relative to this, for precision.
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+        self._charging: bool | None = None
+
+    def reset(self) -> None:
+        """Discard all samples, e.g. after a profile change."""
+        self._samples.clear()
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+
+    def add(self, battery_info: BatteryInfo, timestamp: float | None = None) -> None:
+        """Add a sample, expiring samples older than the window.
+
+        The window restarts when the battery switches between charging and
+        discharging, since the old rate no longer applies.
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        charging = battery_info['charging']
+        if charging != self._charging:
+            self._charging = charging
+            self.reset()
+        charge = combined_charge(battery_info)
+        if charge is None:
+            return
+        if not self._samples:
+            self._origin = now
+        t = now - self._origin
+        self._samples.append((t, charge))
+        self._sum_t += t
+        self._sum_y += charge
+        self._sum_tt += t * t
+        self._sum_ty += t * charge
+        while self._samples and t - self._samples[0][0] > self.window:
+            old_t, old_y = self._samples.popleft()
+            self._sum_t -= old_t
+            self._sum_y -= old_y
+            self._sum_tt -= old_t * old_t
+            self._sum_ty -= old_t * old_y
+        if t > 10 * self.window:
+            self._rebase()
+
+    def _rebase(self) -> None:
+        """Move the time origin to the oldest sample and recompute the sums.
+
+        Keeps the running sums small and free of accumulated rounding error.
+        Runs once per ten windows, so the cost per sample stays O(1) amortized.
+        """
+        shift = self._samples[0][0]
+        self._origin += shift
+        samples = [(t - shift, y) for t, y in self._samples]
+        self.reset()
+        for t, y in samples:
+            self._samples.append((t, y))
+            self._sum_t += t
+            self._sum_y += y
+            self._sum_tt += t * t
+            self._sum_ty += t * y
+
+    @property
+    def rate(self) -> float | None:
+        """Charge rate in percent per second, or None if not yet known."""
+        count = len(self._samples)
+        if count < MIN_SAMPLES:
+            return None
+        if self._samples[-1][0] - self._samples[0][0] < MIN_SPAN_SECONDS:
+            return None
+        denominator = count * self._sum_tt - self._sum_t * self._sum_t
+        if denominator <= 0:
+            return None
+        return (count * self._sum_ty - self._sum_t * self._sum_y) / denominator
+
+    def seconds_to(self, target: float) -> float | None:
+        """Return the estimated seconds until the charge reaches `target` %.
+
+        Returns None if there is no estimate, or the charge is not moving
+        towards the target.
+        """
+        rate = self.rate
+        if rate is None or not self._samples:
+            return None
+        current = self._samples[-1][1]
+        remaining = target - current
+        if remaining == 0 or rate == 0 or (remaining > 0) != (rate > 0):
+            return None
+        return remaining / rate
+
+
+def charge_target(battery_info: BatteryInfo, full_charge: bool) -> float:
+    """Return the charge % the batteries are heading for.
+
+    Args:
+        battery_info: Current battery statistics.
+        full_charge: True if full-charge mode is enabled.
+    """
+    if battery_info['discharging']:
+        return 0.0
+    ends = [b.end for b in battery_info['batteries'] if b.end is not None]
+    if full_charge or not ends:
+        return 100.0
+    return float(min(ends))
+
+
+def format_eta(seconds: float, target: float) -> str:
+    """Format an estimate, e.g. 'Time to full: 1 h 05 min'."""
+    minutes = max(1, round(seconds / 60))
+    hours, minutes = divmod(minutes, 60)
+    duration = f"{hours} h {minutes:02d} min" if hours else f"{minutes} min"
+    if target >= 100:
+        label = "Time to full"
+    elif target <= 0:
+        label = "Time to empty"
+    else:
+        label = f"Time to {target:.0f}%"
+    return f"{label}: {duration}"
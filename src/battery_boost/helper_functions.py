@@ -1,20 +1,35 @@
 """Helper functions for Battery Boost."""
 
 import argparse
-from importlib.metadata import version
-import shutil
+import logging
 from pathlib import Path
-from typing import TypeAlias
+import shutil
+from typing import TYPE_CHECKING, Any, NamedTuple
 
+from battery_boost.backends import (
+    read_after_async,
+    read_battery_info,
+    read_battery_info_async
+)
+from battery_boost.battery import BatteryInfo
 from battery_boost.constants import (
     THEME,
     ThemeName,
     FONT_SIZES,
     ThemeKeys,
-    DEFAULT_THEME
+    DEFAULT_THEME,
+    STATS_CACHE_TTL_S
 )
-from battery_boost.shell_commands import TlpCommandError, tlp_get_stats
-from battery_boost.tlp_parser import parse_tlp_stats, BatteryInfo
+from battery_boost import power_supply
+from battery_boost.history import default_history_path
+from battery_boost.power_supply import charge_behaviour_overridden
+from battery_boost.query_cache import BATTERY_STATS, queries
+from battery_boost.scheduler import PollPolicy
+from battery_boost.shell_commands import fast_toggle, run_privileged, tlp_active, tlp_running
+from battery_boost.tlp_config import read_tlp_config, thresholds_applied
+
+if TYPE_CHECKING:
+    from battery_boost.command_engine import CommandEngine
 
 
 def command_on_path(command: str) -> bool:
@@ -22,47 +37,203 @@ def command_on_path(command: str) -> bool:
     return bool(shutil.which(command))
 
 
+def tlp_ready_error() -> str | None:
+    """Check that TLP is installed and active.
+
+    Runs no dialogs, so it can run on a background thread during startup.
+
+    Returns:
+        An error message, or None if TLP is ready.
+    """
+    if not command_on_path('tlp'):
+        return "TLP is not installed or not in PATH."
+    if command_on_path('systemctl'):
+        if not tlp_running():
+            return "TLP service is not active."
+    elif not tlp_active():  # Less reliable fallback.
+        return "TLP service is not active."
+    return None
+
+
+def reset_tlp(force: bool = False) -> bool:
+    """Run `tlp start`, unless TLP's default profile is already applied.
+
+    `tlp start` reconfigures every TLP subsystem (USB, PCIe, disks, radios),
+    so it is skipped when the battery thresholds already match the TLP
+    configuration and charging is not inhibited. If the current state cannot
+    be determined, the reset runs.
+
+    Args:
+        force: Always run `tlp start`.
+
+    Returns:
+        True if `tlp start` was run.
+
+    Raises:
+        subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError:
+            If `tlp start` fails.
+    """
+    if not force and not charge_behaviour_overridden():
+        if thresholds_applied(get_battery_stats(), read_tlp_config()):
+            logging.debug("TLP thresholds already match configuration; skipping tlp start.")
+            return False
+    run_privileged('start')
+    return True
+
+
 def get_battery_stats() -> BatteryInfo:
     """Retrieve raw statistics from battery.
 
-    Failure of `tlp_get_stats()` may be non-fatal, so we just return
+    Statistics are read by the backend selected on first use (see
+    `backends`): directly from sysfs where possible, else `sudo tlp-stat -b`.
+
+    Failure of the backends may be non-fatal, so we just return
     the message for display and let the user decide what to do.
 
+    Statistics read less than `STATS_CACHE_TTL_S` ago are reused, and
+    concurrent callers share one read.
+
     Returns:
         BatteryInfo: discharge status, and battery statistics or
         an error message.
     """
-    try:
-        raw_stats = tlp_get_stats()
-        return parse_tlp_stats(raw_stats)
-    except TlpCommandError as exc:
-        return {'discharging': False, 'info': f"Error: {exc}"}
+    return queries.get(BATTERY_STATS, read_battery_info, STATS_CACHE_TTL_S)
+
+
+async def get_battery_stats_async(engine: 'CommandEngine') -> BatteryInfo:
+    """Coroutine variant of `get_battery_stats()`.
+
+    A `tlp-stat` backend runs on `engine`, so it is cancelled on shutdown.
+    """
+    return await queries.get_async(BATTERY_STATS,
+                                   lambda: read_battery_info_async(engine),
+                                   STATS_CACHE_TTL_S)
+
+
+async def apply_profile_async(engine: 'CommandEngine',
+                              full_charge: bool,
+                              fast: bool = True) -> BatteryInfo:
+    """Apply a profile and return the battery statistics read afterwards.
+
+    The statistics reflect the new thresholds: the fast toggle waits for them
+    to read back, and TLP has applied them when its command returns. They are
+    read by the selected backend (see `backends`); with `tlp-stat`, the
+    profile is applied and `tlp-stat -b` read in a single privileged round
+    trip. They are cached, so an immediate refresh reuses them.
+
+    Errors are raised; pass them to `shell_commands.toggle_failed()` on the
+    Tk main loop.
+
+    Args:
+        engine: The engine to run commands on.
+        full_charge: True for the full-charge profile, False for the default.
+        fast: Write only the battery thresholds where possible.
+
+    Raises:
+        subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError:
+            As `shell_commands.run_privileged()`.
+    """
+    if fast and await engine.call(fast_toggle, full_charge):
+        battery_info = await read_battery_info_async(engine)
+    else:
+        battery_info = await read_after_async(engine,
+                                              'fullcharge' if full_charge else 'start')
+    queries.put(BATTERY_STATS, battery_info, STATS_CACHE_TTL_S)
+    return battery_info
 
 
 def on_ac_power() -> bool:
-    """Return True if on AC power, else False.
+    """Return True if on AC (or USB-C) power, else False.
+
+    Reads the `online` state of the supplies in the cached power supply index.
 
     Raises:
         RuntimeError: If AC power cannot be determined.
    """
-    base = Path("/sys/class/power_supply")
-    if base.is_dir():
-        for child in base.iterdir():
-            type_file = child / "type"
-            try:
-                # Check for AC adaptor.
-                if type_file.is_file() and type_file.read_text().strip() == "Mains":
-                    # Then check if it online.
-                    online_file = child / "online"
-                    if online_file.is_file():
-                        return online_file.read_text().strip() == "1"
-            except OSError:
-                pass
-    # Unsupported system
-    raise RuntimeError("Power supply information not available.")
-
-
-Config: TypeAlias = tuple[ThemeKeys, tuple[str, int], tuple[str, int], float]
+    online = power_supply.external_power_online()
+    if online is None:
+        # Unsupported system
+        raise RuntimeError("Power supply information not available.")
+    return online
+
+
+class Config(NamedTuple):
+    """Application configuration from the command line.
+
+    The defaults are those of the GUI without options, except for the fonts.
+
+    Attributes:
+        theme: Theme colors to apply.
+        standard_font: Font for main UI elements.
+        small_font: Font for secondary UI elements.
+        scale_factor: Scale factor for UI sizing.
+        poll_policy: Intervals for refreshing battery statistics.
+        history_path: File to record charge history to, or None.
+        command: Headless command to run instead of the GUI, or None.
+        json: Print headless status as JSON.
+        startup_trace: Print startup phase timings.
+        force_reset: Run `tlp start` even if TLP's configured thresholds
+            are already applied.
+        toggle_mode: 'fast' to toggle by writing only the battery thresholds
+            where possible, 'tlp' to run `tlp fullcharge` / `tlp start`.
+        profile: Time hot paths, for `--profile`.
+        profile_output: File to write `cProfile` statistics to, or None.
+        metrics_path: Prometheus textfile collector file to write battery
+            metrics to, or None.
+    """
+    theme: ThemeKeys = DEFAULT_THEME
+    standard_font: tuple[str, int] = ('TkDefaultFont', 12)
+    small_font: tuple[str, int] = ('TkDefaultFont', 10)
+    scale_factor: float = 1.0
+    poll_policy: PollPolicy = PollPolicy()
+    history_path: Path | None = None
+    command: str | None = None
+    json: bool = False
+    startup_trace: bool = False
+    force_reset: bool = False
+    toggle_mode: str = 'fast'
+    profile: bool = False
+    profile_output: Path | None = None
+    metrics_path: Path | None = None
+
+
+class _VersionAction(argparse.Action):
+    """Print the version and exit.
+
+    Unlike argparse's 'version' action, the version is only looked up when
+    requested, as importing `importlib.metadata` is slow.
+    """
+
+    def __init__(self, option_strings: list[str], dest: str, **kwargs: Any) -> None:
+        super().__init__(option_strings, dest, nargs=0,
+                         default=argparse.SUPPRESS,
+                         help="show program's version number and exit", **kwargs)
+
+    def __call__(self, parser: argparse.ArgumentParser, *_args: Any, **_kwargs: Any) -> None:
+        from importlib.metadata import version  # pylint: disable=import-outside-toplevel
+        parser.exit(message=f"Battery Boost {version('tlp-battery-boost')}\n")
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for a positive integer."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value!r}")
+    return number
+
+
+def _backoff_factor(value: str) -> float:
+    """argparse type for a back-off factor of at least 1."""
+    try:
+        number = float(value)
+    except ValueError:
+        number = 0.0
+    if number < 1.0:
+        raise argparse.ArgumentTypeError(f"must be a number >= 1: {value!r}")
+    return number
 
 
 def parse_args(argv: list[str]) -> Config:
@@ -72,16 +243,30 @@ def parse_args(argv: list[str]) -> Config:
         argv: List of command-line arguments.
 
     Returns:
-        tuple: (theme_dict, standard_font, small_font, scale_factor).
+        Config: theme, fonts, scale factor, polling policy, history file and
+            headless command (None to start the GUI).
     """
     parser = argparse.ArgumentParser(
-        description="A simple GUI to enable `tlp fullcharge`.",
+        description="A simple GUI to enable `tlp fullcharge`. Given a COMMAND, "
+                    "runs it without the GUI: `status` prints battery "
+                    "statistics, `fullcharge` and `default` apply a TLP profile.",
         # Automatically add defaults to help text.
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
-    parser.add_argument('-v', '--version',
-                        action='version',
-                        version=f"Battery Boost {version('tlp-battery-boost')}")
+    parser.add_argument(
+        'command',
+        nargs='?',
+        choices=['status', 'fullcharge', 'default'],
+        default=None,  # GUI unless given.
+        metavar='COMMAND',
+        help="Headless command: status, fullcharge or default")
+
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help="With `status`, print battery statistics as JSON")
+
+    parser.add_argument('-v', '--version', action=_VersionAction)
 
     parser.add_argument(
         '-f', '--font-size',
@@ -97,6 +282,117 @@ def parse_args(argv: list[str]) -> Config:
         default='light' if DEFAULT_THEME == THEME[ThemeName.LIGHT] else 'dark',
         help="Color theme")
 
+    defaults = PollPolicy()
+    polling = parser.add_argument_group(
+        'polling',
+        "Battery status is polled quickly after a change, then less often "
+        "while nothing changes, up to a limit for each charging state.")
+    polling.add_argument(
+        '--poll-min',
+        type=_positive_int,
+        default=defaults.min_interval_ms,
+        metavar='MS',
+        help="Polling interval after a change, in milliseconds")
+    polling.add_argument(
+        '--poll-max-charging',
+        type=_positive_int,
+        default=defaults.max_charging_ms,
+        metavar='MS',
+        help="Longest polling interval while charging")
+    polling.add_argument(
+        '--poll-max-discharging',
+        type=_positive_int,
+        default=defaults.max_discharging_ms,
+        metavar='MS',
+        help="Longest polling interval while discharging")
+    polling.add_argument(
+        '--poll-max-full',
+        type=_positive_int,
+        default=defaults.max_full_ms,
+        metavar='MS',
+        help="Longest polling interval on AC power when not charging")
+    polling.add_argument(
+        '--poll-backoff',
+        type=_backoff_factor,
+        default=defaults.backoff,
+        metavar='FACTOR',
+        help="Polling interval multiplier while nothing changes")
+    polling.add_argument(
+        '--poll-hidden',
+        type=_positive_int,
+        default=defaults.hidden_ms,
+        metavar='MS',
+        help="Polling interval while the window is minimized or hidden")
+
+    parser.add_argument(
+        '--history',
+        type=Path,
+        nargs='?',
+        const=default_history_path(),
+        default=argparse.SUPPRESS,  # Off unless given.
+        metavar='FILE',
+        help="Record charge history to FILE (if FILE is omitted: %(const)s)")
+
+    parser.add_argument(
+        '--metrics',
+        type=Path,
+        default=argparse.SUPPRESS,  # Off unless given.
+        metavar='FILE',
+        help="Write battery metrics for the Prometheus node_exporter textfile "
+             "collector to FILE (.prom), on every refresh or after a command")
+
+    parser.add_argument(
+        '--force-reset',
+        action='store_true',
+        help="Always run `tlp start` on launch, even if the configured "
+             "thresholds are already applied")
+
+    parser.add_argument(
+        '--toggle-mode',
+        choices=['fast', 'tlp'],
+        default='fast',
+        help="How the button switches profiles: `fast` writes only the battery "
+             "charge thresholds (falling back to TLP if that is not possible), "
+             "`tlp` runs `tlp fullcharge` / `tlp start`")
+
+    parser.add_argument(
+        '--startup-trace',
+        action='store_true',
+        help="Print how long each startup phase takes")
+
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help="Time commands, parsing and rendering; print a summary on exit "
+             "or on SIGUSR1")
+
+    parser.add_argument(
+        '--profile-output',
+        type=Path,
+        default=argparse.SUPPRESS,  # Off unless given.
+        metavar='FILE',
+        help="Also run cProfile and write its statistics to FILE (.prof); "
+             "implies --profile")
+
     parsed_args = parser.parse_args(argv)
     standard_font, small_font, scale_factor = FONT_SIZES[parsed_args.font_size]
-    return THEME[ThemeName(parsed_args.theme)], standard_font, small_font, scale_factor
+    poll_policy = PollPolicy(min_interval_ms=parsed_args.poll_min,
+                             max_charging_ms=parsed_args.poll_max_charging,
+                             max_discharging_ms=parsed_args.poll_max_discharging,
+                             max_full_ms=parsed_args.poll_max_full,
+                             backoff=parsed_args.poll_backoff,
+                             hidden_ms=parsed_args.poll_hidden)
+    return Config(THEME[ThemeName(parsed_args.theme)],
+                  standard_font,
+                  small_font,
+                  scale_factor,
+                  poll_policy,
+                  getattr(parsed_args, 'history', None),
+                  parsed_args.command,
+                  parsed_args.json,
+                  parsed_args.startup_trace,
+                  parsed_args.force_reset,
+                  parsed_args.toggle_mode,
+                  parsed_args.profile or 'profile_output' in parsed_args,
+                  getattr(parsed_args, 'profile_output', None),
+                  getattr(parsed_args, 'metrics', None))
@@ -0,0 +1,230 @@
+"""On-disk charge history in a compact fixed-width binary format.
+
+Each sample is a 16-byte little-endian record:
+
+| Offset | Type    | Field                                        |
+|--------|---------|----------------------------------------------|
+| 0      | uint32  | Unix timestamp (seconds)                     |
+| 4      | uint8   | Battery id (N in BATN)                       |
+| 5      | uint8   | Status code (`StatusCode`)                   |
+| 6      | uint16  | Charge in tenths of a percent (0xFFFF: n/a)  |
+| 8      | float32 | Energy now, Wh (NaN: n/a)                    |
+| 12     | float32 | Power, W (NaN: n/a)                          |
+
+A file starts with a 16-byte header (`MAGIC`), so records stay aligned and the
+file can be memory-mapped as an array of records. Records are appended in time
+order, which allows time ranges to be found by binary search.
+
+Samples are buffered in memory and appended in batches, so recording a sample
+never writes to disk by itself. When a file exceeds its size limit it is rotated
+(`history.bin` -> `history.bin.1` -> ...), keeping a fixed number of old files.
+"""
+
+import math
+import mmap
+import os
+import re
+import struct
+import time
+from bisect import bisect_left
+from enum import IntEnum
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from battery_boost.battery import BatteryInfo
+
+MAGIC = b'BBHIST\x00\x01' + bytes(8)
+"""File header: format name and version, padded to one record."""
+
+RECORD = struct.Struct('<IBBHff')
+"""Record layout."""
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+"""Rotate history files at 8 MiB (about 500,000 samples)."""
+
+DEFAULT_BACKUPS = 3
+"""Number of rotated history files to keep."""
+
+_FLUSH_RECORDS = 256
+_FLUSH_SECONDS = 300.0
+_NO_CHARGE = 0xFFFF
+_BATTERY_ID = re.compile(r'BAT(\d+)')
+
+
+def default_history_path() -> Path:
+    """Return the default history file, under `$XDG_STATE_HOME`."""
+    state_home = os.environ.get('XDG_STATE_HOME') or Path.home() / '.local' / 'state'
+    return Path(state_home) / 'battery_boost' / 'history.bin'
+
+
+class StatusCode(IntEnum):
+    """Battery status stored in history records."""
+    UNKNOWN = 0
+    CHARGING = 1
+    DISCHARGING = 2
+    NOT_CHARGING = 3
+    FULL = 4
+
+    @classmethod
+    def from_status(cls, status: str | None) -> 'StatusCode':
+        """Return the code for a sysfs/tlp-stat status string."""
+        try:
+            return cls[(status or '').upper().replace(' ', '_')]
+        except KeyError:
+            return cls.UNKNOWN
+
+
+class HistoryRecord(NamedTuple):
+    """One decoded history sample. Unavailable values are None."""
+    timestamp: int
+    battery: int
+    status: StatusCode
+    charge: float | None
+    energy: float | None
+    power: float | None
+
+
+class HistoryRecorder:
+    """Buffer samples and append them to the history file in batches."""
+
+    def __init__(self,
+                 path: Path,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 backups: int = DEFAULT_BACKUPS) -> None:
+        """Create the recorder. The file is not touched until the first flush.
+
+        Args:
+            path: History file.
+            max_bytes: Size at which the file is rotated.
+            backups: Number of rotated files to keep.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+
+    def record(self, battery_info: BatteryInfo, timestamp: float | None = None) -> None:
+        """Buffer one sample per battery, flushing when a batch is complete."""
+        now = int(time.time() if timestamp is None else timestamp)
+        for index, battery in enumerate(battery_info['batteries']):
+            match = _BATTERY_ID.search(battery.name)
+            battery_id = int(match.group(1)) if match else index
+            charge = (_NO_CHARGE if battery.charge is None
+                      else min(max(round(battery.charge * 10), 0), _NO_CHARGE - 1))
+            self._buffer += RECORD.pack(
+                now,
+                battery_id & 0xFF,
+                StatusCode.from_status(battery.status),
+                charge,
+                math.nan if battery.energy_now is None else battery.energy_now,
+                math.nan if battery.power is None else battery.power)
+        if (len(self._buffer) >= _FLUSH_RECORDS * RECORD.size
+                or time.monotonic() - self._last_flush >= _FLUSH_SECONDS):
+            self.flush()
+
+    def flush(self) -> None:
+        """Append buffered samples to the file, rotating it if full."""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            size = self.path.stat().st_size if self.path.exists() else 0
+            if size and size + len(self._buffer) > self.max_bytes:
+                self._rotate()
+                size = 0
+            with self.path.open('ab') as file:
+                if size == 0:
+                    file.write(MAGIC)
+                file.write(self._buffer)
+        except OSError:
+            pass  # History is best effort; never disturb the GUI.
+        self._buffer.clear()
+
+    def close(self) -> None:
+        """Flush any buffered samples."""
+        self.flush()
+
+    def _rotate(self) -> None:
+        """Shift history.bin -> history.bin.1 -> ..., dropping the oldest."""
+        for number in range(self.backups, 0, -1):
+            source = self.path if number == 1 else _backup_path(self.path, number - 1)
+            if source.exists():
+                source.replace(_backup_path(self.path, number))
+
+
+def _backup_path(path: Path, number: int) -> Path:
+    """Return the path of a rotated history file."""
+    return path.with_name(f"{path.name}.{number}")
+
+
+class _Timestamps:
+    """Sequence view of the timestamps in a mapped history file, for bisect."""
+
+    def __init__(self, data: mmap.mmap) -> None:
+        self._data = data
+        self._count = (len(data) - len(MAGIC)) // RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        return struct.unpack_from('<I', self._data, len(MAGIC) + index * RECORD.size)[0]
+
+
+def _decode(values: tuple[int, int, int, int, float, float]) -> HistoryRecord:
+    """Convert unpacked record fields to a `HistoryRecord`."""
+    timestamp, battery, status, charge, energy, power = values
+    try:
+        status_code = StatusCode(status)
+    except ValueError:
+        status_code = StatusCode.UNKNOWN
+    return HistoryRecord(timestamp,
+                         battery,
+                         status_code,
+                         None if charge == _NO_CHARGE else charge / 10,
+                         None if math.isnan(energy) else energy,
+                         None if math.isnan(power) else power)
+
+
+def _read_file(path: Path, start: float, end: float) -> Iterator[HistoryRecord]:
+    """Yield records from one file with start <= timestamp < end."""
+    try:
+        with path.open('rb') as file:
+            if os.fstat(file.fileno()).st_size <= len(MAGIC):
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(MAGIC)] != MAGIC:
+                    return
+                timestamps = _Timestamps(data)
+                first = bisect_left(timestamps, start)
+                last = bisect_left(timestamps, end, lo=first)
+                offset = len(MAGIC) + first * RECORD.size
+                view = memoryview(data)[offset:len(MAGIC) + last * RECORD.size]
+                try:
+                    for values in RECORD.iter_unpack(view):
+                        yield _decode(values)
+                finally:
+                    view.release()
+    except (OSError, ValueError):
+        return
+
+
+def read_history(start: float = 0,
+                 end: float = math.inf,
+                 path: Path | None = None,
+                 backups: int = DEFAULT_BACKUPS) -> Iterator[HistoryRecord]:
+    """Yield history records in time order, including rotated files.
+
+    Args:
+        start: Earliest timestamp (inclusive), in Unix seconds.
+        end: Latest timestamp (exclusive), in Unix seconds.
+        path: History file. Defaults to `default_history_path()`.
+        backups: Number of rotated files to search.
+    """
+    if path is None:
+        path = default_history_path()
+    files = [_backup_path(path, number) for number in range(backups, 0, -1)] + [path]
+    for file in files:
+        yield from _read_file(file, start, end)
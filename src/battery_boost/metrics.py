@@ -0,0 +1,178 @@
+"""Battery metrics for the Prometheus node_exporter textfile collector.
+
+`MetricsExporter` writes gauges to a `.prom` file in the directory given to
+node_exporter's `--collector.textfile.directory`, from the statistics the app
+already polls, so monitoring needs no extra `tlp-stat` run:
+
+| Metric                                        | Labels            |
+|-----------------------------------------------|-------------------|
+| `battery_boost_charge_percent`                | battery           |
+| `battery_boost_charge_start_threshold_percent`| battery           |
+| `battery_boost_charge_stop_threshold_percent` | battery           |
+| `battery_boost_battery_status`                | battery, status   |
+| `battery_boost_full_charge_profile`           |                   |
+| `battery_boost_poll_duration_seconds`         |                   |
+
+`battery_boost_battery_status` is 1 for the battery's current status and 0 for
+the others. Unavailable values are omitted.
+
+The file is replaced atomically (written to a temporary file, then renamed),
+so the collector never reads a partial file. It is only rewritten when a value
+other than the poll duration changes, at most every `MIN_WRITE_INTERVAL_S`,
+and otherwise every `MAX_WRITE_INTERVAL_S` to keep the poll duration current.
+"""
+
+import os
+import time
+from pathlib import Path
+
+from battery_boost.battery import BatteryInfo
+from battery_boost.history import StatusCode
+
+MIN_WRITE_INTERVAL_S = 5.0
+"""Never rewrite the file more often than this."""
+
+MAX_WRITE_INTERVAL_S = 60.0
+"""Rewrite the file at least this often while values are being recorded."""
+
+_PREFIX = 'battery_boost_'
+
+_GAUGES = (
+    ('charge_percent', 'Current charge as a percentage of full capacity.'),
+    ('charge_start_threshold_percent', 'Start charge threshold.'),
+    ('charge_stop_threshold_percent', 'Stop charge threshold.'),
+    ('battery_status', 'Charging status; 1 for the current status.'),
+)
+
+
+def _label(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    """Format a sample value."""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_metrics(battery_info: BatteryInfo, full_charge: bool | None) -> str:
+    """Return battery gauges in the Prometheus text exposition format.
+
+    Args:
+        battery_info: Battery statistics.
+        full_charge: True if the full-charge profile is applied, False for the
+            default profile, None if unknown (the gauge is omitted).
+    """
+    samples: dict[str, list[str]] = {name: [] for name, _ in _GAUGES}
+    for battery in battery_info['batteries']:
+        label = f'battery="{_label(battery.name)}"'
+        for name, value in (('charge_percent', battery.charge),
+                            ('charge_start_threshold_percent', battery.start),
+                            ('charge_stop_threshold_percent', battery.end)):
+            if value is not None:
+                samples[name].append(f"{_PREFIX}{name}{{{label}}} {_number(value)}")
+        current = StatusCode.from_status(battery.status)
+        samples['battery_status'] += [
+            f'{_PREFIX}battery_status{{{label},status="{code.name.lower()}"}} '
+            f'{int(code is current)}'
+            for code in StatusCode]
+
+    lines = []
+    for name, help_text in _GAUGES:
+        if samples[name]:
+            lines += [f"# HELP {_PREFIX}{name} {help_text}",
+                      f"# TYPE {_PREFIX}{name} gauge",
+                      *samples[name]]
+    if full_charge is not None:
+        lines += [f"# HELP {_PREFIX}full_charge_profile "
+                  "1 if the full-charge profile is applied, 0 for the default.",
+                  f"# TYPE {_PREFIX}full_charge_profile gauge",
+                  f"{_PREFIX}full_charge_profile {int(full_charge)}"]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def _format_poll_duration(seconds: float) -> str:
+    """Return the poll duration gauge."""
+    return (f"# HELP {_PREFIX}poll_duration_seconds "
+            "Time taken to read the battery statistics.\n"
+            f"# TYPE {_PREFIX}poll_duration_seconds gauge\n"
+            f"{_PREFIX}poll_duration_seconds {seconds:.6f}\n")
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Replace `path` with `text`, so that readers never see a partial file.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with temporary.open('w', encoding='utf-8') as file:
+            file.write(text)
+        temporary.chmod(0o644)
+        os.replace(temporary, path)
+    except OSError:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+class MetricsExporter:
+    """Write battery metrics to a textfile collector file, rate-limited."""
+
+    def __init__(self, path: Path) -> None:
+        """Create the exporter. The file is written on the first `update()`.
+
+        Args:
+            path: The `.prom` file to write.
+        """
+        self.path = path
+        self._written: str | None = None  # Last written, without poll duration.
+        self._pending: tuple[str, str] | None = None  # (metrics, file text)
+        self._last_write = 0.0
+
+    def update(self,
+               battery_info: BatteryInfo,
+               full_charge: bool | None,
+               poll_seconds: float | None = None,
+               now: float | None = None) -> bool:
+        """Record new statistics, writing the file if due.
+
+        Args:
+            battery_info: Battery statistics from the latest poll.
+            full_charge: The current profile; see `format_metrics()`.
+            poll_seconds: How long the poll took, or None if unknown.
+            now: `time.monotonic()`, for testing.
+
+        Returns:
+            True if the file was written.
+        """
+        now = time.monotonic() if now is None else now
+        metrics = format_metrics(battery_info, full_charge)
+        text = metrics if poll_seconds is None else metrics + _format_poll_duration(poll_seconds)
+        self._pending = (metrics, text)
+        if self._written is not None:
+            elapsed = now - self._last_write
+            if elapsed < MIN_WRITE_INTERVAL_S:
+                return False
+            if metrics == self._written and elapsed < MAX_WRITE_INTERVAL_S:
+                return False
+        return self._write(now)
+
+    def flush(self) -> None:
+        """Write the latest statistics if they changed since the last write."""
+        if self._pending is not None and self._pending[0] != self._written:
+            self._write(time.monotonic())
+
+    def _write(self, now: float) -> bool:
+        """Write the pending statistics. Returns True on success."""
+        assert self._pending is not None
+        metrics, text = self._pending
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.path, text)
+        except OSError:
+            return False  # Monitoring is best effort; never disturb the GUI.
+        self._written = metrics
+        self._pending = None
+        self._last_write = now
+        return True
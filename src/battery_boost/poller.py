@@ -0,0 +1,92 @@
+"""Background polling of battery statistics.
+
+Runs the (potentially slow) battery statistics fetch on a worker thread so that
+the Tkinter main loop is never blocked. Results are handed back through a
+thread-safe queue that the GUI drains from `after()` callbacks.
+"""
+
+import queue
+import threading
+from typing import Callable
+
+from battery_boost.battery import BatteryInfo, message_info
+
+
+class StatsPoller:
+    """Fetch battery statistics on a single background worker thread.
+
+    Requests made while a fetch is already in flight are coalesced, so that at
+    most one fetch runs at any time and at most one more is queued behind it.
+    """
+
+    def __init__(self, fetch: Callable[[], BatteryInfo]) -> None:
+        """Start the worker thread.
+
+        Args:
+            fetch: Callable returning fresh battery statistics.
+        """
+        self._fetch = fetch
+        self._results: queue.SimpleQueue[tuple[int, BatteryInfo]] = queue.SimpleQueue()
+        self._generation = 0
+        self._wake = threading.Event()
+        self._stopped = False
+        self._busy = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='battery-stats-poller',
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """True while a fetch is requested or in progress."""
+        return self._busy or self._wake.is_set()
+
+    def request(self) -> None:
+        """Request a fetch. Coalesced with any request not yet started."""
+        self._wake.set()
+
+    def get_result(self) -> BatteryInfo | None:
+        """Return the most recent completed result, or None if there is none.
+
+        Older results still in the queue are superseded and discarded, as are
+        results of fetches started before `discard()` was called.
+        """
+        result = None
+        try:
+            while True:
+                generation, latest = self._results.get_nowait()
+                if generation == self._generation:
+                    result = latest
+        except queue.Empty:
+            pass
+        return result
+
+    def discard(self) -> None:
+        """Discard pending results, including that of a fetch in progress.
+
+        Used when the statistics are known to have changed since the fetch
+        started, e.g. after a profile toggle.
+        """
+        self._generation += 1
+
+    def stop(self) -> None:
+        """Stop the worker thread. A fetch in progress is not interrupted."""
+        self._stopped = True
+        self._wake.set()
+
+    def _run(self) -> None:
+        """Worker loop: wait for a request, fetch, publish the result."""
+        while True:
+            self._wake.wait()
+            if self._stopped:
+                return
+            self._busy = True
+            self._wake.clear()
+            generation = self._generation
+            try:
+                result = self._fetch()
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                # Keep the worker alive; report the failure in place of stats.
+                result = message_info(f"Error: {exc}")
+            self._results.put((generation, result))
+            self._busy = False
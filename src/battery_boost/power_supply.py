@@ -0,0 +1,223 @@
+"""Direct sysfs access to battery statistics.
+
+Reads `/sys/class/power_supply/BAT*` without spawning a subprocess, producing
+the same `BatteryInfo` summary as parsing `sudo tlp-stat -b`.
+
+Power supply devices are classified once into an index (`supply_index()`),
+so that checking AC power reads only the `online` files of known supplies. The
+index is rebuilt after `invalidate_supply_index()` (called on hotplug uevents),
+when the directory's modification time changes, or when a device disappears.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from battery_boost.battery import BatteryInfo, BatterySnapshot, battery_info
+from battery_boost.profiling import profiler
+
+
+POWER_SUPPLY_PATH = Path("/sys/class/power_supply")
+"""Kernel power supply class directory."""
+
+
+class SysfsUnavailableError(Exception):
+    """Raised when battery statistics cannot be read from sysfs."""
+
+
+@dataclass(frozen=True)
+class SupplyIndex:
+    """Power supply devices by kind, each sorted by name.
+
+    Attributes:
+        base: The power supply class directory.
+        mtime_ns: Modification time of `base` when the index was built.
+        mains: AC adaptors (type 'Mains') reporting an `online` state.
+        usb: USB power supplies, including USB-C PD ports (type 'USB'),
+            reporting an `online` state.
+        batteries: System batteries (type 'Battery', excluding peripheral
+            batteries such as wireless mice, whose scope is 'Device').
+    """
+    base: Path
+    mtime_ns: int
+    mains: tuple[Path, ...] = ()
+    usb: tuple[Path, ...] = ()
+    batteries: tuple[Path, ...] = ()
+
+
+class _IndexCache:  # pylint: disable=too-few-public-methods
+    """The current `SupplyIndex`, shared by all threads."""
+    index: SupplyIndex | None = None
+    lock = threading.Lock()
+
+
+def _mtime_ns(base: Path) -> int:
+    """Return the directory's modification time, or -1 if it is missing."""
+    try:
+        return os.stat(base).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _build_index(base: Path) -> SupplyIndex:
+    """Scan the power supply class directory and classify each device."""
+    mtime_ns = _mtime_ns(base)
+    kinds: dict[str, list[Path]] = {'Mains': [], 'USB': [], 'Battery': []}
+    try:
+        children = sorted(base.iterdir())
+    except OSError:
+        children = []
+    for child in children:
+        kind = _read_attr(child, 'type')
+        if kind not in kinds:
+            continue
+        if kind == 'Battery' and _read_attr(child, 'scope') == 'Device':
+            continue
+        if kind != 'Battery' and not (child / 'online').is_file():
+            continue
+        kinds[kind].append(child)
+    return SupplyIndex(base,
+                       mtime_ns,
+                       tuple(kinds['Mains']),
+                       tuple(kinds['USB']),
+                       tuple(kinds['Battery']))
+
+
+def supply_index(base: Path | None = None) -> SupplyIndex:
+    """Return the index of power supply devices, rebuilding it if stale.
+
+    Args:
+        base: The power supply class directory. Defaults to `POWER_SUPPLY_PATH`.
+    """
+    if base is None:
+        base = POWER_SUPPLY_PATH
+    index = _IndexCache.index
+    if index is None or index.base != base or index.mtime_ns != _mtime_ns(base):
+        with _IndexCache.lock:
+            index = _IndexCache.index = _build_index(base)
+    return index
+
+
+def invalidate_supply_index() -> None:
+    """Discard the index, e.g. after a power supply was added or removed."""
+    _IndexCache.index = None
+
+
+def battery_paths(base: Path | None = None) -> list[Path]:
+    """Return the sysfs directories of all system batteries, sorted by name."""
+    return list(supply_index(base).batteries)
+
+
+def external_power_online(base: Path | None = None) -> bool | None:
+    """Return True if any AC adaptor or USB power supply is online.
+
+    Machines may have several supplies (e.g. an AC adaptor and USB-C PD
+    ports); external power is connected if any of them is online.
+
+    Returns:
+        True or False, or None if there is no supply with an `online` state.
+    """
+    index = supply_index(base)
+    states = [_read_attr(supply, 'online') for supply in index.mains + index.usb]
+    if None in states:
+        # A supply was removed without the index noticing; rescan.
+        invalidate_supply_index()
+        index = supply_index(base)
+        states = [_read_attr(supply, 'online') for supply in index.mains + index.usb]
+    known = [state for state in states if state is not None]
+    if not known:
+        return None
+    return '1' in known
+
+
+def read_battery(battery: Path) -> BatterySnapshot:
+    """Read one battery's statistics from its sysfs directory."""
+    start = _read_number(battery, 'charge_control_start_threshold')
+    end = _read_number(battery, 'charge_control_end_threshold')
+    energy_now = _read_number(battery, 'energy_now')
+    energy_full = _read_number(battery, 'energy_full')
+    power = _read_number(battery, 'power_now')
+
+    # Prefer energy (µWh) over charge (µAh) counters, as tlp-stat does.
+    if energy_full:
+        charge = _percent(energy_now, energy_full)
+        capacity = _percent(energy_full, _read_number(battery, 'energy_full_design'))
+    else:
+        charge_full = _read_number(battery, 'charge_full')
+        charge = _percent(_read_number(battery, 'charge_now'), charge_full)
+        capacity = _percent(charge_full, _read_number(battery, 'charge_full_design'))
+    if charge is None:
+        charge = _read_number(battery, 'capacity')
+
+    return BatterySnapshot(
+        name=battery.name,
+        status=_read_attr(battery, 'status'),
+        start=None if start is None else int(start),
+        end=None if end is None else int(end),
+        charge=charge,
+        capacity=capacity,
+        # sysfs reports micro-units.
+        energy_now=None if energy_now is None else energy_now / 1e6,
+        energy_full=None if energy_full is None else energy_full / 1e6,
+        power=None if power is None else power / 1e6,
+    )
+
+
+def read_battery_stats(base: Path | None = None) -> BatteryInfo:
+    """Read battery statistics directly from sysfs.
+
+    Args:
+        base: The power supply class directory. Defaults to `POWER_SUPPLY_PATH`.
+
+    Returns:
+        BatteryInfo: discharge status, and battery snapshots.
+
+    Raises:
+        SysfsUnavailableError: If no battery exposes charge thresholds in sysfs.
+    """
+    with profiler.timed('read sysfs'):
+        batteries = tuple(read_battery(battery) for battery in battery_paths(base))
+    if not any(battery.start is not None or battery.end is not None
+               for battery in batteries):
+        raise SysfsUnavailableError("No battery charge thresholds found in sysfs.")
+    return battery_info(batteries)
+
+
+def charge_behaviour_overridden(base: Path | None = None) -> bool:
+    """Return True if any battery is set to inhibit charging or force discharge.
+
+    `charge_behaviour` lists the choices with the active one in brackets, e.g.
+    `[auto] inhibit-charge force-discharge`. Batteries without it are ignored.
+    """
+    for battery in battery_paths(base):
+        value = _read_attr(battery, 'charge_behaviour')
+        if value and '[' in value and '[auto]' not in value.split():
+            return True
+    return False
+
+
+def _read_attr(battery: Path, name: str) -> str | None:
+    """Return the stripped contents of a sysfs attribute, or None if unreadable."""
+    try:
+        return (battery / name).read_text().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _read_number(battery: Path, name: str) -> float | None:
+    """Return a numeric sysfs attribute, or None if missing or invalid."""
+    value = _read_attr(battery, name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _percent(numerator: float | None, denominator: float | None) -> float | None:
+    """Return `numerator / denominator` as a percentage rounded to 0.1."""
+    if numerator is None or not denominator:
+        return None
+    return round(100 * numerator / denominator, 1)
@@ -0,0 +1,200 @@
+"""Long-lived privileged helper for Battery Boost.
+
+Started once as root (via `sudo`) after authentication, the helper runs a fixed
+allowlist of TLP commands on behalf of the GUI, avoiding a new `sudo` process
+(with its PAM and timestamp checks) for every command.
+
+It can also set battery charge thresholds directly in sysfs
+(`SET_THRESHOLDS`), which is much faster than `tlp start` or `tlp fullcharge`
+and leaves TLP's other power settings untouched.
+
+Protocol: the client writes one request per line to stdin: an operation name,
+followed by space-separated arguments for `SET_THRESHOLDS`, or several
+`OPERATIONS` names to run in sequence (e.g. `fullcharge stats`, applying a
+profile and reading the result in one round trip). For each
+request the helper writes one JSON object per line to stdout, either
+`{"returncode": int, "stdout": str, "stderr": str}` or
+`{"error": str, "errno": int | None, "filename": str | None, "timeout": bool}`.
+
+This module runs in isolated mode (`python -I`) and must only import from the
+standard library.
+"""
+
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+
+OPERATIONS: dict[str, list[str]] = {
+    'stats': ['tlp-stat', '-b'],
+    'fullcharge': ['tlp', 'fullcharge'],
+    'start': ['tlp', 'start'],
+}
+"""Allowed operations and the commands they run."""
+
+PING = 'ping'
+"""Operation that runs nothing. Used to confirm the helper has started."""
+
+SET_THRESHOLDS = 'thresholds'
+"""Operation that writes charge thresholds.
+
+Arguments are triples of battery name, start and end threshold, e.g.
+`thresholds BAT0 75 80 BAT1 - 80`. `-` leaves a threshold unchanged.
+"""
+
+POWER_SUPPLY_PATH = Path('/sys/class/power_supply')
+
+_TIMEOUT = 5  # All TLP commands expected to be fast.
+_SETTLE_TIMEOUT = 1.0  # Wait this long for written thresholds to read back.
+_SETTLE_INTERVAL = 0.01
+_BATTERY_NAME = re.compile(r'[A-Za-z0-9_]+')
+
+
+def handle_request(request: str) -> dict[str, Any]:
+    """Run an allowed operation and return the response object.
+
+    A sequence of `OPERATIONS` runs in order, stopping at the first failure,
+    and returns the response of the last operation run.
+    """
+    operation, *args = request.split() or ['']
+    if operation == PING and not args:
+        return _success()
+    if operation == SET_THRESHOLDS:
+        return set_thresholds(args)
+    operations = [operation, *args]
+    if not all(name in OPERATIONS for name in operations):
+        return _error(f"Operation not allowed: {request!r}")
+    response = _success()
+    for name in operations:
+        response = _run(OPERATIONS[name])
+        if response.get('returncode') != 0:
+            break
+    return response
+
+
+def _run(argv: list[str]) -> dict[str, Any]:
+    """Run a command and return the response object."""
+    try:
+        result = subprocess.run(argv,
+                                capture_output=True,
+                                text=True,
+                                check=False,
+                                timeout=_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return _error(f"{argv[0]} timed out", timeout=True)
+    except OSError as exc:
+        return _error(exc.strerror or str(exc), exc.errno, exc.filename)
+    return {'returncode': result.returncode,
+            'stdout': result.stdout,
+            'stderr': result.stderr}
+
+
+def _threshold(value: str) -> int | None:
+    """Return a threshold argument as an int, or None for '-'.
+
+    Raises:
+        ValueError: If the value is not '-' or an integer from 0 to 100.
+    """
+    if value == '-':
+        return None
+    number = int(value)
+    if not 0 <= number <= 100 or str(number) != value:
+        raise ValueError(value)
+    return number
+
+
+def set_thresholds(args: list[str]) -> dict[str, Any]:
+    """Validate and write charge thresholds. See `SET_THRESHOLDS`.
+
+    All arguments are validated before anything is written. For each battery
+    the end threshold is written first if the new start threshold would not
+    be below the current end threshold, as drivers reject start >= end.
+
+    Returns once every written threshold reads back with its new value, so
+    that a following read sees the new profile.
+    """
+    if not args or len(args) % 3:
+        return _error(f"Invalid arguments: {' '.join(args)!r}")
+    writes = []
+    for name, start_arg, end_arg in zip(args[::3], args[1::3], args[2::3]):
+        battery = POWER_SUPPLY_PATH / name
+        kind = None
+        if _BATTERY_NAME.fullmatch(name):
+            try:
+                start, end = _threshold(start_arg), _threshold(end_arg)
+                kind = (battery / 'type').read_text().strip()
+            except (ValueError, OSError):
+                pass
+        if kind != 'Battery':
+            return _error(f"Invalid battery thresholds: {name} {start_arg} {end_arg}")
+        if start is not None and end is not None and start >= end:
+            return _error(f"Start threshold must be below end threshold: {name}")
+        writes.append((battery, start, end))
+
+    for battery, start, end in writes:
+        attributes = [('charge_control_start_threshold', start),
+                      ('charge_control_end_threshold', end)]
+        try:
+            current_end = int((battery / 'charge_control_end_threshold').read_text())
+        except (OSError, ValueError):
+            current_end = None
+        if start is not None and current_end is not None and start >= current_end:
+            attributes.reverse()
+        for attribute, value in attributes:
+            if value is None:
+                continue
+            try:
+                (battery / attribute).write_text(f"{value}\n")
+            except OSError as exc:
+                return _error(exc.strerror or str(exc), exc.errno, str(battery / attribute))
+    return _wait_for_thresholds(writes)
+
+
+def _wait_for_thresholds(writes: list[tuple[Path, int | None, int | None]]) -> dict[str, Any]:
+    """Wait until the written thresholds read back as expected."""
+    expected = [(battery / attribute, value)
+                for battery, start, end in writes
+                for attribute, value in (('charge_control_start_threshold', start),
+                                         ('charge_control_end_threshold', end))
+                if value is not None]
+    deadline = time.monotonic() + _SETTLE_TIMEOUT
+    while True:
+        try:
+            pending = [path for path, value in expected
+                       if int(path.read_text()) != value]
+        except (OSError, ValueError) as exc:
+            return _error(f"Could not read back thresholds: {exc}")
+        if not pending:
+            return _success()
+        if time.monotonic() >= deadline:
+            return _error(f"Thresholds not applied: {' '.join(map(str, pending))}")
+        time.sleep(_SETTLE_INTERVAL)
+
+
+def _success() -> dict[str, Any]:
+    """Return the response object for an operation without output."""
+    return {'returncode': 0, 'stdout': '', 'stderr': ''}
+
+
+def _error(message: str,
+           errno: int | None = None,
+           filename: str | None = None,
+           timeout: bool = False) -> dict[str, Any]:
+    """Return an error response object."""
+    return {'error': message, 'errno': errno, 'filename': filename, 'timeout': timeout}
+
+
+def main() -> None:
+    """Serve requests from stdin until it is closed."""
+    for line in sys.stdin:
+        response = handle_request(line.strip())
+        sys.stdout.write(json.dumps(response) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
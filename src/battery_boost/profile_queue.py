@@ -0,0 +1,134 @@
+"""Serialized profile changes with collapsing of redundant requests.
+
+All changes of the TLP profile go through one `ProfileQueue`, which applies
+them one at a time on the `CommandEngine`. Requests record only the desired
+profile: while a change is running (or within `debounce` seconds of the first
+request), further requests replace the desired profile instead of queueing
+another change. A double click therefore applies nothing, and any number of
+clicks during a slow `tlp start` cost at most one more change, to the profile
+finally wanted.
+
+Battery statistics reads go through `ProfileQueue.read()`, which waits for a
+change in progress to finish, so a poll never sees a half-applied profile.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import TYPE_CHECKING, Awaitable, Callable, NamedTuple, TypeVar
+
+from battery_boost.battery import BatteryInfo
+
+if TYPE_CHECKING:
+    from battery_boost.command_engine import CommandEngine
+
+T = TypeVar('T')
+
+
+class ProfileResult(NamedTuple):
+    """Outcome of a run of the queue.
+
+    Attributes:
+        full_charge: The profile now applied.
+        battery_info: Statistics read after the last change, or None if no
+            change was needed (the requests cancelled out).
+    """
+    full_charge: bool
+    battery_info: BatteryInfo | None
+
+
+class ProfileQueue:  # pylint: disable=too-many-instance-attributes
+    """Apply profile changes one at a time, collapsing pending requests."""
+
+    def __init__(self,
+                 engine: CommandEngine,
+                 apply: Callable[[bool], Awaitable[BatteryInfo]],
+                 full_charge: bool = False,
+                 debounce: float = 0.0) -> None:
+        """Create the queue.
+
+        Args:
+            engine: The engine to run changes on.
+            apply: Coroutine function applying a profile (True for full
+                charge) and returning the statistics read afterwards.
+            full_charge: The profile currently applied.
+            debounce: Seconds to wait for further requests before the first
+                change of a run.
+        """
+        self._engine = engine
+        self._apply = apply
+        self._debounce = debounce
+        self._lock = threading.Lock()
+        self._applied = self._target = full_charge
+        self._running = False
+        self._mutation: asyncio.Lock | None = None  # Created on the engine loop.
+
+    @property
+    def applied(self) -> bool:
+        """The profile applied by the last completed change."""
+        return self._applied
+
+    @property
+    def target(self) -> bool:
+        """The profile most recently requested."""
+        return self._target
+
+    @property
+    def busy(self) -> bool:
+        """True while changes are pending or running."""
+        return self._running
+
+    def request(self, full_charge: bool
+                ) -> concurrent.futures.Future[ProfileResult] | None:
+        """Ask for a profile. Safe to call from any thread.
+
+        Returns:
+            A future for a new run of the queue, or None if a run in progress
+            will apply the request.
+
+        Raises:
+            RuntimeError: If the engine has been shut down.
+        """
+        with self._lock:
+            self._target = full_charge
+            if self._running:
+                return None
+            future = self._engine.submit(self._run())
+            self._running = True
+            return future
+
+    async def read(self, fetch: Callable[[], Awaitable[T]]) -> T:
+        """Await `fetch()` once no change is in progress."""
+        async with self._mutation_lock():
+            return await fetch()
+
+    def _mutation_lock(self) -> asyncio.Lock:
+        """Return the lock held while a change runs. Call on the engine loop."""
+        if self._mutation is None:
+            self._mutation = asyncio.Lock()
+        return self._mutation
+
+    async def _run(self) -> ProfileResult:
+        """Apply the target profile until it stops changing."""
+        battery_info = None
+        try:
+            if self._debounce:
+                await asyncio.sleep(self._debounce)
+            async with self._mutation_lock():
+                while True:
+                    with self._lock:
+                        target = self._target
+                        if target == self._applied:
+                            # Later requests start a new run.
+                            self._running = False
+                            return ProfileResult(target, battery_info)
+                    battery_info = await self._apply(target)
+                    self._applied = target
+        except BaseException:
+            with self._lock:
+                # Unknown whether the change was applied; don't retry it.
+                self._target = self._applied
+                self._running = False
+            raise
@@ -0,0 +1,190 @@
+"""Opt-in timing of hot paths, for `--profile`.
+
+Code on hot paths (commands, parsing, rendering, refresh ticks) is wrapped in
+`profiler.timed(name)`. While profiling is disabled this costs one attribute
+check. When enabled, each duration is added to an in-memory histogram, and
+`Profiler.dump()` prints the count, median, 95th percentile and maximum per
+name. The summary is printed when the app quits, or on `SIGUSR1`:
+
+    kill -USR1 $(pgrep -f battery_boost)
+
+Modules keeping their own counters (e.g. `query_cache`) register them with
+`Profiler.add_counters()`, and they are printed after the histograms.
+
+`Profiler.start()` can also run `cProfile` for the whole session, writing a
+`.prof` file (for `python -m pstats` or snakeviz) when profiling stops.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from types import FrameType, TracebackType
+from typing import TYPE_CHECKING, Callable, ContextManager, Mapping, TextIO
+
+if TYPE_CHECKING:
+    import cProfile
+
+SAMPLES_PER_NAME = 2048
+"""Durations kept per name for percentiles. Count and maximum cover all calls."""
+
+_NULL_TIMER: ContextManager[None] = contextlib.nullcontext()
+
+
+class Histogram:
+    """Durations of one timed operation."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples: deque[float] = deque(maxlen=SAMPLES_PER_NAME)
+
+    def add(self, seconds: float) -> None:
+        """Record one duration."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> float:
+        """Return a percentile of the recent durations (nearest rank), or 0.0."""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+
+class _Timer:
+    """Context manager adding its duration to a histogram."""
+
+    __slots__ = ('_owner', '_name', '_start')
+
+    def __init__(self, owner: Profiler, name: str) -> None:
+        self._owner = owner
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self,
+                 exc_type: type[BaseException] | None,
+                 exc: BaseException | None,
+                 traceback: TracebackType | None) -> None:
+        self._owner.record(self._name, time.perf_counter() - self._start)
+
+
+class Profiler:
+    """Collect duration histograms by name. Disabled until `start()`."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._histograms: dict[str, Histogram] = {}
+        self._counters: dict[str, Callable[[], Mapping[str, int]]] = {}
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._cprofile: cProfile.Profile | None = None
+        self._cprofile_path: Path | None = None
+
+    def start(self, cprofile_path: Path | None = None) -> None:
+        """Enable timing, and `cProfile` if `cprofile_path` is given.
+
+        Args:
+            cprofile_path: Write `cProfile` statistics here when `stop()` is
+                called. Only the main thread is profiled.
+        """
+        self.enabled = True
+        self._started = time.perf_counter()
+        if cprofile_path is not None:
+            import cProfile  # pylint: disable=import-outside-toplevel,redefined-outer-name
+            self._cprofile_path = cprofile_path
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def timed(self, name: str) -> ContextManager[None]:
+        """Return a context manager that records its duration under `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record a duration measured elsewhere."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def add_counters(self, name: str, counters: Callable[[], Mapping[str, int]]) -> None:
+        """Include counters in the summary.
+
+        Args:
+            name: Heading for the counters, e.g. 'query cache'.
+            counters: Returns the current counter values by name. Only called
+                when the summary is printed.
+        """
+        with self._lock:
+            self._counters[name] = counters
+
+    def summary(self) -> str:
+        """Return a table of the histograms, slowest total time first, then counters."""
+        elapsed = time.perf_counter() - self._started
+        with self._lock:
+            rows = sorted(self._histograms.items(),
+                          key=lambda item: item[1].total,
+                          reverse=True)
+            lines = [f"Profile ({elapsed:.1f} s):",
+                     f"  {'name':<32}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}"
+                     f"{'max ms':>10}{'total s':>10}"]
+            lines += [f"  {name:<32}{histogram.count:>8}"
+                      f"{histogram.percentile(50) * 1000:>10.2f}"
+                      f"{histogram.percentile(95) * 1000:>10.2f}"
+                      f"{histogram.max * 1000:>10.2f}"
+                      f"{histogram.total:>10.3f}"
+                      for name, histogram in rows]
+            lines += [f"  {name}: " + ', '.join(f"{key} {value}"
+                                                for key, value in counters().items())
+                      for name, counters in self._counters.items()]
+        return '\n'.join(lines)
+
+    def dump(self, file: TextIO = sys.stderr) -> None:
+        """Print the summary, if enabled."""
+        if self.enabled:
+            print(self.summary(), file=file, flush=True)
+
+    def stop(self, file: TextIO = sys.stderr) -> None:
+        """Print the summary, write the `cProfile` file, and disable timing."""
+        if not self.enabled:
+            return
+        self.dump(file)
+        self.enabled = False
+        if self._cprofile is not None and self._cprofile_path is not None:
+            self._cprofile.disable()
+            try:
+                self._cprofile.dump_stats(self._cprofile_path)
+                print(f"cProfile statistics written to {self._cprofile_path}", file=file)
+            except OSError as exc:
+                print(f"Could not write {self._cprofile_path}: {exc}", file=file)
+            self._cprofile = None
+
+    def install_signal_handler(self, signum: int = signal.SIGUSR1) -> None:
+        """Print the summary whenever the process receives `signum`.
+
+        Python runs signal handlers on the main thread, between Tk callbacks.
+        """
+        def handler(_signum: int, _frame: FrameType | None) -> None:
+            self.dump()
+        signal.signal(signum, handler)
+
+
+profiler = Profiler()
+"""Process-wide profiler used by the instrumented code."""
@@ -0,0 +1,172 @@
+"""Short-lived cache for battery and TLP queries.
+
+Callers asking for the same data within milliseconds of each other (e.g. the
+startup reset check and the first refresh, or a toggle followed by a refresh)
+share one result instead of each reading sysfs or spawning `tlp-stat`.
+
+Each key has its own time-to-live. Concurrent requests for a key share the
+fetch already in flight. `QueryCache.invalidate()` drops cached values when
+the underlying state is known to have changed; a fetch in flight at that time
+still completes for its callers, but its result is not cached.
+
+Hit, miss and shared-fetch counts of `queries` are printed in the `--profile`
+summary.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable, NamedTuple, TypeVar
+
+from battery_boost.profiling import profiler
+
+T = TypeVar('T')
+
+BATTERY_STATS = 'battery_stats'
+"""Key of `helper_functions.get_battery_stats()` results."""
+
+TLP_ACTIVE = 'tlp_active'
+"""Key of `shell_commands.tlp_active()` results."""
+
+TLP_RUNNING = 'tlp_running'
+"""Key of `shell_commands.tlp_running()` results."""
+
+
+class CacheStats(NamedTuple):
+    """Cache counters since start.
+
+    Attributes:
+        hits: Requests answered from a cached value.
+        misses: Requests that started a fetch.
+        shared: Requests that waited for a fetch already in flight.
+    """
+    hits: int
+    misses: int
+    shared: int
+
+
+class QueryCache:
+    """Thread-safe cache of query results with per-key TTL and shared fetches."""
+
+    def __init__(self) -> None:
+        self._values: dict[str, tuple[float, Any]] = {}
+        self._in_flight: dict[str, concurrent.futures.Future[Any]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._shared = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hit, miss and shared-fetch counters."""
+        return CacheStats(self._hits, self._misses, self._shared)
+
+    def get(self, key: str, fetch: Callable[[], T], ttl: float) -> T:
+        """Return a cached value, or call `fetch()` and cache its result.
+
+        If another thread is already fetching `key`, wait for its result
+        instead. Exceptions raised by `fetch` are passed to every waiting
+        caller and are not cached.
+
+        Args:
+            key: Name of the query.
+            fetch: Returns a fresh value.
+            ttl: Seconds a fetched value stays valid.
+        """
+        value, future, owner = self._lookup(key)
+        if future is None:
+            return value
+        if not owner:
+            return future.result()
+        try:
+            value = fetch()
+        except BaseException as exc:
+            self._finish(key, future, exc=exc)
+            raise
+        self._finish(key, future, value, ttl)
+        return value
+
+    async def get_async(self, key: str, fetch: Callable[[], Awaitable[T]], ttl: float) -> T:
+        """Coroutine variant of `get()`. `fetch()` returns an awaitable."""
+        # Imported here so that the headless commands do not load asyncio.
+        import asyncio  # pylint: disable=import-outside-toplevel
+        value, future, owner = self._lookup(key)
+        if future is None:
+            return value
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await fetch()
+        except BaseException as exc:
+            self._finish(key, future, exc=exc)
+            raise
+        self._finish(key, future, value, ttl)
+        return value
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        """Cache a value obtained elsewhere, e.g. statistics read after a toggle."""
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._values[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, *keys: str) -> None:
+        """Drop the cached values of `keys`, or of every key if none are given."""
+        with self._lock:
+            if not keys:
+                keys = tuple(self._values.keys() | self._in_flight.keys())
+            for key in keys:
+                self._values.pop(key, None)
+                self._in_flight.pop(key, None)
+
+    def _lookup(self, key: str) -> tuple[Any, concurrent.futures.Future[Any] | None, bool]:
+        """Look up `key`.
+
+        Returns:
+            (value, None, False) for a cached value, (None, future, False) for
+            a fetch in flight, or (None, future, True) if the caller must fetch
+            the value and complete the future with `_finish()`.
+        """
+        with self._lock:
+            cached = self._values.get(key)
+            if cached is not None and time.monotonic() < cached[0]:
+                self._hits += 1
+                return cached[1], None, False
+            if key in self._in_flight:
+                self._shared += 1
+                return None, self._in_flight[key], False
+            self._misses += 1
+            future: concurrent.futures.Future[Any] = concurrent.futures.Future()
+            self._in_flight[key] = future
+            return None, future, True
+
+    def _finish(self,
+                key: str,
+                future: concurrent.futures.Future[Any],
+                value: Any = None,
+                ttl: float = 0.0,
+                exc: BaseException | None = None) -> None:
+        """Publish a fetch result to waiting callers, caching it if still current."""
+        with self._lock:
+            current = self._in_flight.get(key) is future
+            if current:
+                del self._in_flight[key]
+                if exc is None:
+                    self._values[key] = (time.monotonic() + ttl, value)
+        if exc is None:
+            future.set_result(value)
+        else:
+            future.set_exception(exc)
+
+
+queries = QueryCache()
+"""Cache shared by the query functions."""
+
+
+def _stats_counters() -> dict[str, int]:
+    """Return the counters of `queries`, for the profiling summary."""
+    return queries.stats._asdict()
+
+
+profiler.add_counters('query cache', _stats_counters)
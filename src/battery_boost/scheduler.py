@@ -0,0 +1,104 @@
+"""Adaptive scheduling of battery statistics refreshes.
+
+Polls quickly after something changes (a profile toggle, AC plugged or unplugged,
+the window gaining focus) and backs off exponentially while nothing changes,
+up to a separate limit for each charging state. While the window is hidden,
+polls are only a slow watchdog.
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+
+from battery_boost.constants import (
+    POLL_MIN_INTERVAL_MS,
+    POLL_MAX_CHARGING_MS,
+    POLL_MAX_DISCHARGING_MS,
+    POLL_MAX_FULL_MS,
+    POLL_BACKOFF_FACTOR,
+    POLL_HIDDEN_MS
+)
+from battery_boost.battery import BatteryInfo
+
+
+class PowerState(Enum):
+    """Charging state used to select the polling limit."""
+    CHARGING = 'charging'
+    DISCHARGING = 'discharging'
+    FULL = 'full'  # On AC, not charging (full, or held at a threshold).
+
+
+@dataclass(frozen=True)
+class PollPolicy:
+    """Polling intervals and back-off factor.
+
+    Attributes:
+        min_interval_ms: Interval immediately after a change.
+        max_charging_ms: Longest interval while any battery is charging.
+        max_discharging_ms: Longest interval while any battery is discharging.
+        max_full_ms: Longest interval while on AC and not charging.
+        backoff: Interval multiplier applied after each unchanged poll.
+        hidden_ms: Interval while the window is minimized or hidden.
+    """
+    min_interval_ms: int = POLL_MIN_INTERVAL_MS
+    max_charging_ms: int = POLL_MAX_CHARGING_MS
+    max_discharging_ms: int = POLL_MAX_DISCHARGING_MS
+    max_full_ms: int = POLL_MAX_FULL_MS
+    backoff: float = POLL_BACKOFF_FACTOR
+    hidden_ms: int = POLL_HIDDEN_MS
+
+    def limit(self, state: PowerState) -> int:
+        """Return the longest polling interval for the given state."""
+        if state is PowerState.CHARGING:
+            return self.max_charging_ms
+        if state is PowerState.DISCHARGING:
+            return self.max_discharging_ms
+        return self.max_full_ms
+
+
+def power_state(battery_info: BatteryInfo) -> PowerState:
+    """Classify battery statistics by charging state."""
+    if battery_info['discharging']:
+        return PowerState.DISCHARGING
+    if battery_info['charging']:
+        return PowerState.CHARGING
+    return PowerState.FULL
+
+
+class PollScheduler:
+    """Exponential back-off between polls, reset by changes."""
+
+    def __init__(self, policy: PollPolicy = PollPolicy()) -> None:
+        self.policy = policy
+        self._interval = float(policy.min_interval_ms)
+        self._state = PowerState.FULL
+        self.hidden = False  # True while the window cannot be seen.
+
+    @property
+    def interval_ms(self) -> int:
+        """Delay until the next poll, in milliseconds."""
+        if self.hidden:
+            return max(int(self._interval), self.policy.hidden_ms)
+        return int(self._interval)
+
+    def reset(self) -> None:
+        """Return to fast polling, e.g. after a toggle or focus change."""
+        self._interval = float(self.policy.min_interval_ms)
+
+    def record(self, battery_info: BatteryInfo, changed: bool) -> None:
+        """Update the interval after a poll.
+
+        Args:
+            battery_info: The statistics returned by the poll.
+            changed: True if a displayed value differs from the previous
+                poll. The interval then stays the same instead of backing off.
+        """
+        state = power_state(battery_info)
+        if state is not self._state:
+            # AC plugged or unplugged, or charging started or stopped.
+            self._state = state
+            self.reset()
+            return
+        if changed:
+            return  # Hold the current rate while values are still changing.
+        limit = max(self.policy.limit(state), self.policy.min_interval_ms)
+        self._interval = min(self._interval * self.policy.backoff, float(limit))
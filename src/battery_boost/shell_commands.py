@@ -1,19 +1,42 @@
 """Wrappers for executing TLP system commands in a Tkinter context.
 
 Provides functions to initialize, toggle, and query TLP using sudo,
-with error handling suitable for a GUI application.
+with error handling suitable for a GUI application. Tkinter is only imported
+by the functions that show dialogs, so the headless commands can use this
+module without it.
+
+Privileged commands are sent to a persistent root helper process when one is
+running (see `start_privileged_helper()`), and run through `sudo` otherwise.
+
+Functions ending in `_async` are coroutine variants for the asyncio
+`CommandEngine`; they raise rather than show dialogs.
+
+Query results are cached briefly (see `query_cache`). Cached values are
+dropped whenever a command that changes the TLP state is run.
 """
 
 from __future__ import annotations
 
+import json
+import logging
+import select
 import subprocess
-from tkinter import messagebox
-from typing import TYPE_CHECKING
+import sys
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, IO
 
-from battery_boost.constants import BatteryState
+from battery_boost.constants import TLP_STATUS_CACHE_TTL_S
+from battery_boost.power_supply import SysfsUnavailableError, read_battery_stats
+from battery_boost.privileged_helper import OPERATIONS, PING, SET_THRESHOLDS
+from battery_boost.profiling import profiler
+from battery_boost.query_cache import BATTERY_STATS, TLP_ACTIVE, TLP_RUNNING, queries
+from battery_boost.tlp_config import Thresholds, profile_thresholds, read_tlp_config
 
 if TYPE_CHECKING:
     from battery_boost.app import App
+    from battery_boost.command_engine import CommandEngine
+    from battery_boost.startup import BackgroundCall
 
 
 _TIMEOUT = 5  # All subprocess calls expected to be fast.
@@ -23,16 +46,272 @@ class TlpCommandError(Exception):
     """Raised when tlp-stat fails to run properly."""
 
 
+class _HelperUnavailable(Exception):
+    """Raised when the privileged helper is not running or stops responding."""
+
+
+class PrivilegedHelper:
+    """Client for the persistent root helper process.
+
+    Requests are serialized, so one instance may be shared between threads.
+    """
+
+    _SCRIPT = Path(__file__).with_name('privileged_helper.py')
+
+    def __init__(self) -> None:
+        self._process: subprocess.Popen[str] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """True if the helper process is alive."""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> bool:
+        """Start the helper as root using cached sudo credentials.
+
+        Returns:
+            True if the helper started and responded, else False.
+        """
+        with self._lock:
+            if self.running:
+                return True
+            try:
+                # -n: never prompt; relies on credentials cached by `sudo -v`.
+                # -I: isolated mode, ignoring the user's environment and site.
+                # Outlives this call; stopped by `stop()`, so no `with` block.
+                self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+                    ['sudo', '-n', sys.executable, '-I', str(self._SCRIPT)],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1)
+                self._request(PING)
+            except (OSError, _HelperUnavailable) as exc:
+                logging.warning("Privileged helper not available: %s", exc)
+                self._terminate()
+                return False
+        return True
+
+    def stop(self) -> None:
+        """Stop the helper process without waiting for a request in flight.
+
+        An idle helper is asked to exit. A busy one is terminated, so that the
+        blocked request fails at once instead of waiting for its command.
+        """
+        # Non-blocking, which `with` cannot express; released below.
+        if self._lock.acquire(blocking=False):  # pylint: disable=consider-using-with
+            try:
+                self._terminate()
+            finally:
+                self._lock.release()
+            return
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            # sudo relays SIGTERM to the helper; closing the helper's stdout
+            # then wakes the request blocked in `_request()`.
+            process.terminate()
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        except OSError:
+            pass  # Already gone.
+
+    def run(self, *operations: str) -> subprocess.CompletedProcess[str]:
+        """Run allowed operations as root, in order, in one round trip.
+
+        Returns the result of the last operation run; a failing operation
+        stops the sequence.
+
+        Raises:
+            _HelperUnavailable: If the helper is not running or has failed.
+            OSError: If a command could not be run.
+            subprocess.TimeoutExpired: If a command timed out.
+        """
+        argv = [word
+                for index, operation in enumerate(operations)
+                for word in ([] if index == 0 else ['&&']) + OPERATIONS[operation]]
+        return self._result(argv, ' '.join(operations), len(operations))
+
+    def set_thresholds(self, thresholds: Thresholds) -> None:
+        """Write battery charge thresholds as root.
+
+        Raises:
+            _HelperUnavailable: If the helper is not running or has failed.
+            OSError: If the thresholds were rejected or could not be written.
+        """
+        args = [SET_THRESHOLDS]
+        for battery, (start, end) in thresholds.items():
+            args += [battery,
+                     '-' if start is None else str(start),
+                     '-' if end is None else str(end)]
+        self._result(args, ' '.join(args)).check_returncode()
+
+    def _result(self,
+                argv: list[str],
+                request: str,
+                commands: int = 1) -> subprocess.CompletedProcess[str]:
+        """Send a request and convert its response to a result or exception.
+
+        Args:
+            argv: The command line reported in the result.
+            request: The request line.
+            commands: Number of commands the request runs, each of which
+                may take up to the helper's command timeout.
+        """
+        with self._lock:
+            response = self._request(request, commands)
+        if 'error' in response:
+            if response['timeout']:
+                raise subprocess.TimeoutExpired(argv, _TIMEOUT)
+            if response['errno'] is not None:
+                raise OSError(response['errno'], response['error'], response['filename'])
+            raise OSError(response['error'])
+        return subprocess.CompletedProcess(argv,
+                                           response['returncode'],
+                                           response['stdout'],
+                                           response['stderr'])
+
+    def _request(self, request: str, commands: int = 1) -> dict:
+        """Send one request line and return the decoded response.
+
+        Waits for the command timeout of each of `commands` commands, plus a
+        margin, before giving up on the helper.
+        """
+        if not self.running:
+            raise _HelperUnavailable("Helper is not running.")
+        assert self._process is not None
+        stdin: IO[str] = self._process.stdin  # type: ignore[assignment]
+        stdout: IO[str] = self._process.stdout  # type: ignore[assignment]
+        try:
+            stdin.write(request + '\n')
+            stdin.flush()
+            # The helper enforces its own command timeout; allow a margin.
+            ready, _, _ = select.select([stdout], [], [], _TIMEOUT * max(commands, 1) + 1)
+            line = stdout.readline() if ready else ''
+            response = json.loads(line)
+        except (OSError, ValueError) as exc:
+            self._terminate()
+            raise _HelperUnavailable(f"Helper failed: {exc}") from exc
+        if not isinstance(response, dict):
+            self._terminate()
+            raise _HelperUnavailable("Invalid response from helper.")
+        return response
+
+    def _terminate(self) -> None:
+        """Close the helper's stdin (ending its loop) and reap the process."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            if process.stdin:
+                process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+
+
+_helper = PrivilegedHelper()
+
+
+def start_privileged_helper() -> bool:
+    """Start the persistent root helper. Requires cached sudo credentials.
+
+    Returns:
+        True if the helper is running, else False (commands then use sudo).
+    """
+    return _helper.start()
+
+
+def run_privileged(*operations: str) -> subprocess.CompletedProcess[str]:
+    """Run allowed TLP operations as root and capture their output.
+
+    Uses the persistent helper when available, in a single round trip,
+    otherwise `sudo`. Operations run in order, stopping at the first failure.
+
+    Args:
+        operations: Names of operations in `privileged_helper.OPERATIONS`.
+
+    Returns:
+        The result of the last operation.
+
+    Raises:
+        subprocess.CalledProcessError: If a command exits nonzero.
+        subprocess.TimeoutExpired: If a command times out.
+        OSError: If a command cannot be run.
+    """
+    try:
+        with profiler.timed(f"privileged {' '.join(operations)}"):
+            try:
+                result = _helper.run(*operations)
+            except _HelperUnavailable:
+                for operation in operations:
+                    result = subprocess.run(['sudo', *OPERATIONS[operation]],
+                                            text=True,
+                                            capture_output=True,
+                                            check=True,
+                                            timeout=_TIMEOUT)
+                return result
+        result.check_returncode()
+        return result
+    finally:
+        _state_changed(*operations)
+
+
+async def run_privileged_async(engine: CommandEngine,
+                               *operations: str) -> subprocess.CompletedProcess[str]:
+    """Coroutine variant of `run_privileged()`.
+
+    Without the helper, each command runs as an asyncio subprocess, killed if
+    it times out or the engine shuts down. `sudo` is given no terminal input,
+    so it fails rather than prompting if credentials are not cached.
+    """
+    try:
+        with profiler.timed(f"privileged {' '.join(operations)}"):
+            if _helper.running:
+                try:
+                    result = await engine.call(_helper.run, *operations)
+                except _HelperUnavailable:
+                    pass
+                else:
+                    result.check_returncode()
+                    return result
+            for operation in operations:
+                result = await engine.run(['sudo', *OPERATIONS[operation]],
+                                          timeout=_TIMEOUT)
+            return result
+    finally:
+        _state_changed(*operations)
+
+
+def _state_changed(*operations: str) -> None:
+    """Drop cached query results if `operations` may have changed TLP's state.
+
+    Called even if an operation failed, as it may have partly applied.
+    """
+    if any(operation != 'stats' for operation in operations):
+        queries.invalidate()
+
+
 def tlp_active() -> bool:
     """Return True if TLP is installed, enabled, and has run recently."""
+    return queries.get(TLP_ACTIVE, _tlp_active, TLP_STATUS_CACHE_TTL_S)
+
+
+def _tlp_active() -> bool:
+    """Uncached `tlp_active()`."""
     try:
-        result = subprocess.run(
-            ["tlp-stat", "-s"],
-            capture_output=True,
-            text=True,
-            check=False,  # don't raise if tlp-stat exits nonzero
-            timeout=_TIMEOUT
-        )
+        with profiler.timed('command tlp-stat -s'):
+            result = subprocess.run(
+                ["tlp-stat", "-s"],
+                capture_output=True,
+                text=True,
+                check=False,  # don't raise if tlp-stat exits nonzero
+                timeout=_TIMEOUT
+            )
         output = result.stdout
         state_enabled = False
         last_run_valid = False
@@ -51,75 +330,114 @@ def tlp_active() -> bool:
         return False
 
 
-def initialise_tlp(_parent: App) -> None:
+def initialise_tlp(_parent: App,
+                   pending: BackgroundCall[bool] | None = None
+                   ) -> None:
     """Initialize TLP to the default state.
 
-    Runs `sudo tlp start` to reset configuration. Shows an error dialog and exits
-    if the command fails.
+    Runs `tlp start` as root to reset configuration. Shows an error dialog and
+    exits if the command fails.
+
+    Args:
+        _parent: The Tkinter app instance, used for error dialogs.
+        pending: A TLP reset already running in the background (see
+            `helper_functions.reset_tlp()`), to wait for instead of running
+            `tlp start` here.
     """
     try:
-        subprocess.run(['sudo', 'tlp', 'start'], check=True, timeout=_TIMEOUT)
+        if pending is None:
+            run_privileged('start')
+        else:
+            pending.result()
         return
 
     except Exception as exc:  # pylint: disable=broad-exception-caught
+        from tkinter import messagebox  # pylint: disable=import-outside-toplevel
         messagebox.showerror("TLP Command Error",
                              f"Could not initialize TLP.\n{exc}",
                              parent=_parent)
         _parent.quit_app(f"Error: Could not initialize TLP: {exc}")
 
 
-def tlp_toggle_state(_parent: App, current_state: BatteryState) -> bool:
-    """Toggle TLP between default and full-charge profiles.
+def fast_toggle(full_charge: bool) -> bool:
+    """Apply a profile by writing only the battery charge thresholds.
+
+    The thresholds are written by the privileged helper. The default
+    profile's thresholds are read from the TLP configuration.
 
-    Args:
-        _parent: The Tkinter api instance, used for error dialogs.
-        current_state: The current battery profile.
     Returns:
-        True if successful, False otherwise.
+        True if the thresholds were written. False if the helper is not
+        running, or the thresholds could not be determined or written; the
+        caller should then use TLP.
     """
+    if not _helper.running:
+        return False
     try:
-        if current_state == BatteryState.DEFAULT:
-            subprocess.run(['sudo', 'tlp', 'fullcharge'],
-                           check=True,
-                           capture_output=True,
-                           timeout=_TIMEOUT)
-        else:
-            subprocess.run(['sudo', 'tlp', 'start'],
-                           check=True,
-                           capture_output=True,
-                           timeout=_TIMEOUT)
-    except FileNotFoundError as exc:
+        battery_info = read_battery_stats()
+    except SysfsUnavailableError:
+        return False
+    thresholds = profile_thresholds(battery_info,
+                                    full_charge,
+                                    {} if full_charge else read_tlp_config())
+    if thresholds is None:
+        return False
+    try:
+        with profiler.timed('privileged thresholds'):
+            _helper.set_thresholds(thresholds)
+    except (_HelperUnavailable, OSError, subprocess.SubprocessError) as exc:
+        logging.warning("Fast toggle failed, using TLP instead: %s", exc)
+        return False
+    finally:
+        queries.invalidate(BATTERY_STATS)
+    return True
+
+
+def toggle_allowed(_parent: App, full_charge: bool, fast: bool = True) -> bool:
+    """Check AC power before a toggle, prompting the user if needed.
+
+    `tlp fullcharge` refuses to run on battery; the fast toggle does the same.
+
+    Returns:
+        False if full charge was requested on battery and the user cancelled.
+    """
+    return not (fast and full_charge) or _parent.ensure_ac_power()
+
+
+def toggle_failed(_parent: App, exc: Exception) -> None:
+    """Report a failed toggle. Quits unless the failure is non-fatal.
+
+    Non-fatal: `tlp fullcharge` failed because AC power is disconnected.
+
+    Raises:
+        Exception: `exc`, if it is not an error from running a command.
+    """
+    if isinstance(exc, FileNotFoundError):
         _parent.quit_on_error(f"Command not found: {exc.filename}",
                               "TLP Command Error")
-    except subprocess.CalledProcessError as exc:
+    if isinstance(exc, subprocess.CalledProcessError):
         # Special case: fullcharge requires AC power.
         if not _parent.ensure_ac_power():
-            return False  # Non-fatal failure
+            return  # Non-fatal failure
 
         _parent.quit_on_error(f"TLP command failed: {exc.returncode}:\n"
                               f"{exc.stderr or exc}",
                               "TLP Command Error")
-
-    except (OSError, subprocess.TimeoutExpired) as exc:
+    if isinstance(exc, (OSError, subprocess.TimeoutExpired)):
         _parent.quit_on_error(f"System error while running TLP command: {exc}",
                               "TLP Command Error")
-    return True
+    raise exc
 
 
 def tlp_get_stats() -> str:
     """Retrieve TLP battery statistics.
 
-    Runs `sudo tlp-stat -b` and returns stdout.
+    Runs `tlp-stat -b` as root and returns stdout.
 
     Raises:
         TlpCommandError: Exception if the command fails.
     """
     try:
-        result = subprocess.run(['sudo', 'tlp-stat', '-b'],
-                                text=True,
-                                capture_output=True,
-                                check=True,
-                                timeout=_TIMEOUT)
+        result = run_privileged('stats')
     # pylint: disable=raise-missing-from
     except subprocess.CalledProcessError as exc:
         raise TlpCommandError(f"Failed to run tlp-stat:\n{exc.stderr or exc}")
@@ -130,14 +448,37 @@ def tlp_get_stats() -> str:
     return result.stdout
 
 
+async def tlp_get_stats_async(engine: CommandEngine) -> str:
+    """Coroutine variant of `tlp_get_stats()`.
+
+    Raises:
+        TlpCommandError: Exception if the command fails.
+    """
+    try:
+        result = await run_privileged_async(engine, 'stats')
+    except subprocess.CalledProcessError as exc:
+        raise TlpCommandError(f"Failed to run tlp-stat:\n{exc.stderr or exc}") from exc
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        raise TlpCommandError(f"System error while running tlp-stat: {exc}") from exc
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        raise TlpCommandError(f"Unexpected error: {exc}") from exc
+    return result.stdout
+
+
 def tlp_running() -> bool:
     """Return True if TLP is running, else False."""
+    return queries.get(TLP_RUNNING, _tlp_running, TLP_STATUS_CACHE_TTL_S)
+
+
+def _tlp_running() -> bool:
+    """Uncached `tlp_running()`."""
     try:
-        result = subprocess.run(['systemctl', 'is-active', 'tlp.service'],
-                                capture_output=True,
-                                text=True,
-                                check=True,
-                                timeout=_TIMEOUT)
+        with profiler.timed('command systemctl is-active'):
+            result = subprocess.run(['systemctl', 'is-active', 'tlp.service'],
+                                    capture_output=True,
+                                    text=True,
+                                    check=True,
+                                    timeout=_TIMEOUT)
         return result.stdout.strip() == 'active'
     except (subprocess.CalledProcessError,
             subprocess.TimeoutExpired):
@@ -145,7 +486,8 @@ def tlp_running() -> bool:
 
 
 def revoke_permissions() -> None:
-    """Revoke cached sudo credentials."""
+    """Stop the privileged helper and revoke cached sudo credentials."""
+    _helper.stop()
     try:
         subprocess.run(['sudo', '--remove-timestamp'], check=False)
     except Exception:  # pylint: disable=broad-exception-caught
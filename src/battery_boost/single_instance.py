@@ -0,0 +1,192 @@
+"""Single-instance lock and control socket.
+
+The first GUI instance holds a lock file and listens on a per-user Unix socket,
+both in `$XDG_RUNTIME_DIR` (or a private directory under /tmp). A second launch
+asks the running instance to raise its window and exits, and the headless
+`fullcharge` / `default` commands ask it to switch profile, instead of
+authenticating and resetting TLP again.
+
+Protocol: the client sends one request line, one of `REQUESTS`. The server
+replies with one JSON object per line: `{"ok": bool, "message": str}`.
+"""
+
+import fcntl
+import json
+import os
+import socket
+import stat
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+RAISE = 'raise'
+"""Request to show and raise the window of the running instance."""
+
+REQUESTS = (RAISE, 'fullcharge', 'default')
+"""Requests accepted by the running instance."""
+
+_TIMEOUT = 1.0  # Seconds to wait for a request or reply.
+_BUFFER_SIZE = 4096
+
+
+def runtime_dir() -> Path:
+    """Return a directory only the current user can access, creating it if needed.
+
+    Raises:
+        OSError: If no such directory is available.
+    """
+    uid = os.getuid()
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        path = Path(runtime)
+    else:
+        path = Path(tempfile.gettempdir()) / f'battery_boost-{uid}'
+        path.mkdir(mode=0o700, exist_ok=True)
+    info = path.stat()
+    if info.st_uid != uid or stat.S_IMODE(info.st_mode) & 0o077:
+        raise OSError(f"Runtime directory is not private: {path}")
+    return path
+
+
+def _socket_path(directory: Path | None) -> Path:
+    """Return the path of the control socket."""
+    return (directory or runtime_dir()) / 'battery_boost.sock'
+
+
+def send_request(request: str, directory: Path | None = None) -> dict[str, Any] | None:
+    """Send a request to the running instance.
+
+    Args:
+        request: One of `REQUESTS`.
+        directory: Directory of the socket. Defaults to `runtime_dir()`.
+
+    Returns:
+        The reply, or None if no instance is running (or it did not reply).
+    """
+    try:
+        path = _socket_path(directory)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_TIMEOUT)
+            sock.connect(str(path))
+            sock.sendall(request.encode() + b'\n')
+            reply = json.loads(_read_line(sock))
+    except (OSError, ValueError):
+        return None
+    return reply if isinstance(reply, dict) else None
+
+
+def _read_line(sock: socket.socket) -> bytes:
+    """Read up to the first newline, or until the peer closes the connection."""
+    data = b''
+    while b'\n' not in data and len(data) < _BUFFER_SIZE:
+        chunk = sock.recv(_BUFFER_SIZE)
+        if not chunk:
+            break
+        data += chunk
+    return data.split(b'\n', 1)[0]
+
+
+class SingleInstance:
+    """Lock held by the running instance, and its control socket."""
+
+    def __init__(self, directory: Path | None = None) -> None:
+        """Set up paths. Nothing is locked or opened until `acquire()`.
+
+        Args:
+            directory: Directory for the lock file and socket. Defaults to
+                `runtime_dir()`.
+        """
+        self._directory = directory
+        self._lock_fd: int | None = None
+        self._server: socket.socket | None = None
+        self._socket_path: Path | None = None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting.
+
+        Returns:
+            True if this process is now the only instance. False if another
+            instance holds the lock.
+
+        Raises:
+            OSError: If the lock file cannot be opened.
+        """
+        directory = self._directory or runtime_dir()
+        fd = os.open(directory / 'battery_boost.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        self._directory = directory
+        return True
+
+    def listen(self) -> None:
+        """Listen on the control socket. Requires the lock.
+
+        A socket left behind by an instance that crashed is replaced.
+
+        Raises:
+            OSError: If the socket cannot be created.
+        """
+        assert self._lock_fd is not None, "acquire() the lock first"
+        path = _socket_path(self._directory)
+        path.unlink(missing_ok=True)  # Stale: we hold the lock.
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(str(path))
+            path.chmod(0o600)
+            server.listen(4)
+            server.setblocking(False)
+        except OSError:
+            server.close()
+            raise
+        self._server = server
+        self._socket_path = path
+
+    @property
+    def listening(self) -> bool:
+        """True while the control socket is open."""
+        return self._server is not None
+
+    def fileno(self) -> int:
+        """Return the listening socket, for registering with an event loop."""
+        assert self._server is not None
+        return self._server.fileno()
+
+    def serve(self, handler: Callable[[str], tuple[bool, str]]) -> None:
+        """Answer one pending request, if any. Does not block for long.
+
+        Args:
+            handler: Called with a request from `REQUESTS`; returns (ok, message).
+        """
+        if self._server is None:
+            return
+        try:
+            connection, _ = self._server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        with connection:
+            try:
+                connection.settimeout(_TIMEOUT)
+                request = _read_line(connection).decode(errors='replace').strip()
+                if request in REQUESTS:
+                    ok, message = handler(request)
+                else:
+                    ok, message = False, f"Unknown request: {request!r}"
+                connection.sendall(json.dumps({'ok': ok, 'message': message}).encode()
+                                   + b'\n')
+            except OSError:
+                pass  # The client gave up; nothing to do.
+
+    def close(self) -> None:
+        """Stop listening and release the lock."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            if self._socket_path is not None:
+                self._socket_path.unlink(missing_ok=True)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
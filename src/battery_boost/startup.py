@@ -0,0 +1,102 @@
+"""Startup timing and background preflight checks.
+
+`StartupTrace` records how long each startup phase takes, for
+`--startup-trace`. `BackgroundCall` runs a slow, independent check (such as
+asking systemd whether TLP is active) on a thread, so it overlaps with window
+creation and the password dialog instead of delaying them.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Callable, Generic, TextIO, TypeVar
+
+T = TypeVar('T')
+
+
+def _process_age() -> float | None:
+    """Return seconds since this process started, or None if unknown.
+
+    Read from /proc, so the resolution is one clock tick (usually 10 ms).
+    """
+    try:
+        with open('/proc/self/stat', encoding='ascii') as file:
+            # Field 22 (starttime); the command name in field 2 may contain spaces.
+            fields = file.read().rsplit(')', 1)[1].split()
+        start_ticks = int(fields[19])
+        return (time.clock_gettime(time.CLOCK_BOOTTIME)
+                - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTrace:
+    """Record the duration of consecutive startup phases."""
+
+    def __init__(self, enabled: bool = False) -> None:
+        """Start timing.
+
+        Args:
+            enabled: Print the timings when `report()` is called.
+        """
+        self.enabled = enabled
+        self._interpreter = _process_age()
+        self._start = self._last = time.perf_counter()
+        self._phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        """End `phase`, which started at the previous mark."""
+        now = time.perf_counter()
+        self._phases.append((phase, now - self._last))
+        self._last = now
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Record a phase that ran in the background, outside the sequence."""
+        self._phases.append((f"({phase})", seconds))
+
+    def report(self, file: TextIO = sys.stderr) -> None:
+        """Print the timings, once, if enabled."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        lines = ["Startup trace:"]
+        if self._interpreter is not None:
+            lines.append(f"  {'python startup':<24}{self._interpreter * 1000:9.1f} ms")
+        lines += [f"  {phase:<24}{seconds * 1000:9.1f} ms"
+                  for phase, seconds in self._phases]
+        total = time.perf_counter() - self._start + (self._interpreter or 0.0)
+        lines.append(f"  {'total':<24}{total * 1000:9.1f} ms")
+        print('\n'.join(lines), file=file)
+
+
+class BackgroundCall(Generic[T]):
+    """Run a function on a daemon thread and collect its result later."""
+
+    def __init__(self, func: Callable[[], T]) -> None:
+        self._func = func
+        self._result: T | None = None
+        self._error: BaseException | None = None
+        self.elapsed = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            self._result = self._func()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self._error = exc  # Re-raised in the caller's thread.
+        self.elapsed = time.perf_counter() - start
+
+    @property
+    def done(self) -> bool:
+        """True if the call has finished."""
+        return not self._thread.is_alive()
+
+    def result(self) -> T:
+        """Wait for the call to finish. Return its result or raise its error."""
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result  # type: ignore[return-value]
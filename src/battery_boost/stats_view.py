@@ -0,0 +1,54 @@
+"""Read-only text pane that redraws only the values that changed.
+
+The pane shows a list of segments (see `battery.Segment`). Each keyed segment
+is inserted with a text tag named after its key. While the layout (the fixed
+text and the set of keys) stays the same, an update only replaces the tagged
+ranges whose values changed, instead of deleting and reinserting everything.
+"""
+
+import tkinter as tk
+from typing import Any
+
+from battery_boost.battery import Segment
+
+
+class StatsText(tk.Text):  # pylint: disable=too-many-ancestors
+    """Read-only `tk.Text` updated in place from keyed segments."""
+
+    def __init__(self, master: tk.Misc, **kwargs: Any) -> None:
+        super().__init__(master, **kwargs)
+        self._layout: tuple[tuple[str | None, str | bool], ...] = ()
+        self._values: dict[str, str] = {}
+        # noinspection PyTypeChecker
+        self.config(state=tk.DISABLED)
+
+    def show(self, segments: list[Segment]) -> None:
+        """Display `segments`, replacing only changed values where possible."""
+        # Fixed text and empty values (which leave no tagged range) are layout.
+        layout = tuple((key, text if key is None else bool(text))
+                       for text, key in segments)
+        values = {key: text for text, key in segments if key is not None}
+        if layout == self._layout:
+            changed = [(key, text) for key, text in values.items()
+                       if self._values[key] != text]
+            if not changed:
+                return
+            # noinspection PyTypeChecker
+            self.config(state=tk.NORMAL)
+            for key, text in changed:
+                start, end = self.tag_ranges(key)
+                self.delete(start, end)
+                self.insert(start, text, key)
+        else:
+            # noinspection PyTypeChecker
+            self.config(state=tk.NORMAL)
+            self.delete('1.0', tk.END)
+            # One call: insert(index, chars, tags, chars, tags, ...).
+            chunks: list[str | tuple[str, ...]] = []
+            for chars, tag in segments:
+                chunks += [chars, (tag,) if tag else ()]
+            self.insert(tk.END, '', (), *chunks)
+        # noinspection PyTypeChecker
+        self.config(state=tk.DISABLED)
+        self._layout = layout
+        self._values = values
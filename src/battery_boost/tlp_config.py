@@ -0,0 +1,224 @@
+"""Read TLP's battery charge threshold configuration.
+
+TLP reads its settings from, in order of increasing precedence,
+`/usr/share/tlp/defaults.conf`, `/etc/tlp.d/*.conf` (in name order) and
+`/etc/tlp.conf`. TLP releases before 1.3 use `/etc/default/tlp` instead.
+
+Thresholds are set per battery by `START_CHARGE_THRESH_BAT<N>` and
+`STOP_CHARGE_THRESH_BAT<N>`. They are what `tlp start` restores after
+`tlp fullcharge`, and what the fast toggle writes to restore the default
+profile.
+
+The path constants below are read at call time, so they may be redirected,
+e.g. to a fake tree.
+"""
+
+import re
+from pathlib import Path
+from typing import Iterable
+
+from battery_boost.battery import BatteryInfo
+
+TLP_CONFIG_PATHS = (
+    Path('/etc/default/tlp'),
+    Path('/usr/share/tlp/defaults.conf'),
+    Path('/etc/tlp.d'),
+    Path('/etc/tlp.conf'),
+)
+"""Configuration files and directories, lowest precedence first."""
+
+FULL_CHARGE_THRESHOLDS: dict[str, tuple[int | None, int | None]] = {
+    'thinkpad_acpi': (96, 100),
+    'asus_wmi': (None, 100),
+    'lg_laptop': (None, 100),
+}
+"""(start, end) thresholds set by `tlp fullcharge`, by kernel driver module.
+
+None means the driver has no such threshold. TLP's full-charge values depend
+on the driver (e.g. Dell's start threshold cannot be set to 96), and are only
+known here for these drivers; elsewhere the fast toggle leaves full charge to
+`tlp fullcharge`.
+"""
+
+MODULE_PATH = Path('/sys/module')
+"""Loaded kernel modules."""
+
+Thresholds = dict[str, tuple[int | None, int | None]]
+"""(start, end) thresholds by battery name. None leaves a threshold unchanged."""
+
+_ASSIGNMENT = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_]*)(\+?=)(.*)$')
+_BATTERY_ID = re.compile(r'BAT(\d+)$')
+
+
+def config_files(paths: Iterable[Path] | None = None) -> list[Path]:
+    """Return the existing configuration files, lowest precedence first.
+
+    Directories are expanded to their `*.conf` files, in name order.
+    """
+    if paths is None:
+        paths = TLP_CONFIG_PATHS
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.glob('*.conf')))
+        elif path.is_file():
+            files.append(path)
+    return files
+
+
+def _value(text: str) -> str:
+    """Return an assigned value without quotes or a trailing comment."""
+    text = text.strip()
+    if text[:1] in ('"', "'"):
+        end = text.find(text[0], 1)
+        return text[1:] if end < 0 else text[1:end]
+    return text.split('#', 1)[0].strip()
+
+
+def read_tlp_config(files: Iterable[Path] | None = None) -> dict[str, str]:
+    """Parse TLP configuration files into a dict of settings.
+
+    Later files override earlier ones. `KEY+=value` appends to a setting, as
+    in TLP. Unreadable files are skipped.
+
+    Args:
+        files: Files to read, lowest precedence first. Defaults to
+            `config_files()`.
+    """
+    if files is None:
+        files = config_files()
+    config: dict[str, str] = {}
+    for file in files:
+        try:
+            lines = file.read_text(errors='replace').splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            match = _ASSIGNMENT.match(line)
+            if not match or line.lstrip().startswith('#'):
+                continue
+            key, operator, value = match.group(1), match.group(2), _value(match.group(3))
+            if operator == '+=' and config.get(key):
+                value = f"{config[key]} {value}"
+            config[key] = value
+    return config
+
+
+def _threshold(config: dict[str, str], key: str) -> int | None:
+    """Return a numeric threshold setting, or None if unset or invalid."""
+    try:
+        return int(config[key])
+    except (KeyError, ValueError):
+        return None
+
+
+def configured_thresholds(config: dict[str, str],
+                          battery: str,
+                          index: int = 0) -> tuple[int | None, int | None]:
+    """Return the configured (start, stop) thresholds for a battery.
+
+    Args:
+        config: Settings from `read_tlp_config()`.
+        battery: Kernel battery name, e.g. 'BAT0'.
+        index: Position of the battery, used when its name has no number
+            (e.g. 'BATT'), as TLP calls the main battery BAT0.
+    """
+    match = _BATTERY_ID.match(battery)
+    suffix = f"BAT{match.group(1) if match else index}"
+    return (_threshold(config, f'START_CHARGE_THRESH_{suffix}'),
+            _threshold(config, f'STOP_CHARGE_THRESH_{suffix}'))
+
+
+def thresholds_applied(battery_info: BatteryInfo, config: dict[str, str]) -> bool:
+    """Return True if every battery's thresholds match the configuration.
+
+    Thresholds the battery does not report are not compared. Returns False if
+    a battery has no configured thresholds, or none can be compared, since it
+    is then unknown what `tlp start` would restore.
+    """
+    batteries = battery_info['batteries']
+    if not batteries:
+        return False
+    for index, battery in enumerate(batteries):
+        start, stop = configured_thresholds(config, battery.name, index)
+        compared = [(current, wanted)
+                    for current, wanted in ((battery.start, start), (battery.end, stop))
+                    if current is not None and wanted is not None]
+        if not compared or any(current != wanted for current, wanted in compared):
+            return False
+    return True
+
+
+def full_charge_thresholds(module_path: Path | None = None
+                           ) -> tuple[int | None, int | None] | None:
+    """Return the (start, end) thresholds `tlp fullcharge` sets on this machine.
+
+    Args:
+        module_path: Directory of loaded kernel modules. Defaults to
+            `MODULE_PATH`.
+
+    Returns:
+        The thresholds for the first loaded driver in `FULL_CHARGE_THRESHOLDS`,
+        or None if no known driver is loaded.
+    """
+    base = MODULE_PATH if module_path is None else module_path
+    for module, thresholds in FULL_CHARGE_THRESHOLDS.items():
+        if (base / module).is_dir():
+            return thresholds
+    return None
+
+
+def full_charge_applied(battery_info: BatteryInfo) -> bool | None:
+    """Return True if the batteries have the full-charge thresholds.
+
+    Used when the profile was not set by this process, e.g. by headless
+    commands. Thresholds the battery does not report are not compared.
+
+    Returns:
+        True or False, or None if no battery reports thresholds, or the
+        full-charge thresholds of the driver are not known.
+    """
+    wanted_thresholds = full_charge_thresholds()
+    if wanted_thresholds is None:
+        return None
+    compared = [current == wanted
+                for battery in battery_info['batteries']
+                for current, wanted in zip((battery.start, battery.end), wanted_thresholds)
+                if current is not None]
+    return all(compared) if compared else None
+
+
+def profile_thresholds(battery_info: BatteryInfo,
+                       full_charge: bool,
+                       config: dict[str, str]) -> Thresholds | None:
+    """Return the thresholds that apply a profile, for the fast toggle.
+
+    Only thresholds that a battery reports are included.
+
+    Args:
+        battery_info: Current battery statistics, read from sysfs.
+        full_charge: True for the full-charge profile, False for the default.
+        config: Settings from `read_tlp_config()`.
+
+    Returns:
+        Thresholds by battery, or None if they cannot be determined: a
+        reported threshold is not configured for the default profile, the
+        full-charge thresholds of the driver are not known, or no battery
+        reports thresholds. The caller should then use TLP itself.
+    """
+    full_charge_values = full_charge_thresholds() if full_charge else (None, None)
+    if full_charge_values is None:
+        return None
+    thresholds: Thresholds = {}
+    for index, battery in enumerate(battery_info['batteries']):
+        if battery.start is None and battery.end is None:
+            continue
+        wanted = (full_charge_values if full_charge
+                  else configured_thresholds(config, battery.name, index))
+        start = wanted[0] if battery.start is not None else None
+        end = wanted[1] if battery.end is not None else None
+        if (battery.start is not None and start is None
+                or battery.end is not None and end is None):
+            return None
+        thresholds[battery.name] = (start, end)
+    return thresholds or None
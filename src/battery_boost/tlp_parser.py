@@ -1,116 +1,112 @@
-"""Parsing utilities for interpreting `tlp-stat -b` output."""
+"""Parsing utilities for interpreting `tlp-stat -b` output.
 
-from collections import defaultdict
-from typing import TypedDict
+The parser makes a single pass over the output, dispatching each `key = value`
+line inside a battery section through a table keyed on the sysfs attribute name,
+which selects the snapshot field and converts the value. It handles `tlp-stat -b`
+and `tlp-stat -v` output from TLP 1.3 onwards, including the `tpacpi-bat`
+threshold lines printed by older versions.
+"""
 
-UNKNOWN = "???"
+import re
+from typing import Any, Callable
 
+from battery_boost.battery import BatteryInfo, BatterySnapshot, battery_info
+from battery_boost.profiling import profiler
 
-class BatteryInfo(TypedDict):
-    """Battery info object."""
-    discharging: bool
-    info: str
 
+def _number(value: str) -> float | None:
+    """Convert the leading token of a value, e.g. '44320 [mWh]', to float."""
+    token = value.partition(' ')[0]
+    try:
+        return float(token)
+    except ValueError:
+        return None
 
-def parse_tlp_stats(tlp_stats: str) -> BatteryInfo:
-    """Parse TLP battery stats and return a human-readable summary.
 
-    Args:
-        tlp_stats: Output string from `tlp_get_stats()`.
+def _integer(value: str) -> int | None:
+    """Convert a threshold value, e.g. '75 [%]', to int."""
+    number = _number(value)
+    return None if number is None else int(number)
 
-    Returns:
-        BatteryInfo: discharge status, and battery statistics or an error message.
-    """
-    if not tlp_stats.strip():
-        return {'discharging': False, 'info': "No battery data found."}
-
-    is_discharging = False
-    lines = tlp_stats.splitlines()
-    stats = []
-    current_battery = ""
-    battery_info: defaultdict[str, str] = defaultdict(lambda: UNKNOWN)
-
-    for line in lines:
-        line = line.strip()
-        # Detect start of a new battery section
-        if line.startswith('+++ ') and 'Battery Status:' in line:
-            # Save previous battery (if any)
-            if current_battery:
-                stats.append(_format_battery_str(current_battery, battery_info))
-
-            # Start new one
-            try:
-                current_battery = line.split('Battery Status:')[1].strip()
-            except IndexError:
-                pass
-            battery_info = defaultdict(lambda: UNKNOWN)
-            continue
-
-        # Parse values.
-        if 'charge_control_start_threshold' in line:
-            battery_info['start'] = _get_battery_value(line)
-        elif 'charge_control_end_threshold' in line:
-            battery_info['end'] = _get_battery_value(line)
-        elif line.startswith('Charge'):
-            battery_info['charge'] = _get_battery_value(line)
-        elif line.startswith('Capacity'):
-            battery_info['capacity'] = _get_battery_value(line)
-        elif 'status' in line:
-            battery_info['status'] = _get_battery_status(line)
-            if battery_info['status'].strip().lower() == 'discharging':
-                is_discharging = True  # If any batery is discharging.
-
-    # Add the last battery
-    if current_battery and battery_info:
-        stats.append(_format_battery_str(current_battery, battery_info))
-
-    info = '\n'.join(stats) if stats else "No battery data found."
-    return {'discharging': is_discharging, 'info': info}
-
-
-def _format_battery_str(battery_name: str, info: defaultdict[str, str]) -> str:
-    """Format battery info into a readable text block.
 
-    Args:
-        battery_name: Battery name.
-        info: Dictionary of battery attributes (start, end, charge, capacity).
+def _milli(value: str) -> float | None:
+    """Convert a tlp-stat mWh or mW value to Wh or W."""
+    number = _number(value)
+    return None if number is None else number / 1000
+
+
+def _text(value: str) -> str | None:
+    """Return a text value, e.g. 'Not charging'."""
+    return value or None
 
-    Returns:
-        str: Formatted string representing the battery.
-    """
-    return (f"Current Status: {info['status']}\n\n"
-            f"{battery_name}:\n"
-            f"  Start threshold: {info['start']}%\n"
-            f"  End threshold: {info['end']}%\n"
-            f"  Current Charge: {info['charge']}% "
-            f"of {info['capacity']}%\n"
-            )
 
+# Value key -> (snapshot field, converter).
+_FIELDS: dict[str, tuple[str, Callable[[str], Any]]] = {
+    'charge_control_start_threshold': ('start', _integer),
+    'charge_control_end_threshold': ('end', _integer),
+    'charge_start_threshold': ('start', _integer),  # Pre-5.9 kernels.
+    'charge_stop_threshold': ('end', _integer),
+    'startThreshold': ('start', _integer),  # tpacpi-bat (TLP < 1.4).
+    'stopThreshold': ('end', _integer),
+    'status': ('status', _text),
+    'energy_now': ('energy_now', _milli),
+    'energy_full': ('energy_full', _milli),
+    'power_now': ('power', _milli),
+    'Charge': ('charge', _number),
+    'Capacity': ('capacity', _number),
+}
 
-def _get_battery_value(line_text: str) -> str:
-    """Extract the numeric battery value from a TLP output line.
+
+# Value line for a key in the table, e.g. "/sys/class/power_supply/BAT0/energy_now
+# = 44320 [mWh]", "tpacpi-bat.BAT0.startThreshold = 75 [%]" or "Charge = 83.8 [%]".
+_VALUES = re.compile(
+    r'^[ \t]*(?:/sys/class/power_supply/[^/\n]+/|tpacpi-bat\.[^.\n]+\.)?'
+    rf'({"|".join(_FIELDS)})[ \t]*=[ \t]*([^\n]*?)[ \t]*$',
+    re.MULTILINE)
+
+_SECTION_START = '\n+++ '
+_BATTERY_STATUS = 'Battery Status:'
+
+
+def parse_tlp_stats(tlp_stats: str) -> BatteryInfo:
+    """Parse TLP battery stats into battery snapshots.
+
+    The output is split into `+++` sections in one pass. Sections other than
+    battery status, e.g. the many sections of `tlp-stat -v`, are skipped without
+    looking at their lines. Values in battery sections are extracted by a single
+    compiled pattern and converted once.
 
     Args:
-        line_text: A line from `tlp-stat -b` containing a battery property,
-                   e.g. start/end thresholds, charge, or capacity.
+        tlp_stats: Output string from `tlp_get_stats()`.
 
     Returns:
-        str: The numeric value as a string (e.g., '70', '83.8'), or '???' if not found.
+        BatteryInfo: discharge status, and battery snapshots or a message.
     """
-    parts = line_text.split('=', 1)
-    if len(parts) != 2:
-        return UNKNOWN
-    token = parts[1].strip().split()[0]
-    try:
-        float(token)
-    except ValueError:
-        return UNKNOWN
-    return token
-
-
-def _get_battery_status(line_text: str) -> str:
-    """Extract the battery status from a TLP output line."""
-    parts = line_text.split('=')
-    if len(parts) != 2:
-        return UNKNOWN
-    return parts[1].strip()
+    with profiler.timed('parse tlp-stat'):
+        batteries = []
+        fields = _FIELDS
+        sections = ('\n' + tlp_stats).split(_SECTION_START)
+
+        for section in sections[1:]:  # Skip text before the first section.
+            header, _, body = section.partition('\n')
+            _, found, battery_name = header.partition(_BATTERY_STATUS)
+            battery_name = battery_name.strip()
+            if not found or not battery_name:
+                continue
+            values: dict[str, Any] = {}
+            for key, value in _VALUES.findall(body):
+                name, convert = fields[key]
+                values[name] = convert(value)
+            batteries.append(_snapshot(battery_name, values))
+
+        return battery_info(tuple(batteries))
+
+
+def _snapshot(battery_name: str, values: dict[str, Any]) -> BatterySnapshot:
+    """Build a snapshot, deriving the charge from energy if not reported."""
+    if values.get('charge') is None:
+        energy_now = values.get('energy_now')
+        energy_full = values.get('energy_full')
+        if energy_now is not None and energy_full:
+            values['charge'] = round(100 * energy_now / energy_full, 1)
+    return BatterySnapshot(battery_name, **values)
@@ -0,0 +1,99 @@
+"""Kernel uevent monitoring for power supply changes.
+
+Listens on a netlink socket for `power_supply` uevents (AC plugged/unplugged,
+battery status or threshold changes), so that battery statistics need only be
+refreshed when something has actually changed.
+"""
+
+import socket
+from typing import TypeAlias
+
+
+NETLINK_KOBJECT_UEVENT = 15
+"""Netlink protocol number for kernel object uevents."""
+
+_KERNEL_GROUP = 1  # Multicast group for uevents sent directly by the kernel.
+_BUFFER_SIZE = 8192
+
+Uevent: TypeAlias = dict[str, str]
+"""Uevent properties, e.g. {'ACTION': 'change', 'SUBSYSTEM': 'power_supply'}."""
+
+
+def open_uevent_socket() -> socket.socket:
+    """Open a netlink socket subscribed to kernel uevents.
+
+    Raises:
+        OSError: If netlink sockets are not available.
+    """
+    sock = socket.socket(socket.AF_NETLINK,  # pylint: disable=no-member
+                         socket.SOCK_DGRAM,
+                         NETLINK_KOBJECT_UEVENT)
+    try:
+        sock.bind((0, _KERNEL_GROUP))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def parse_uevent(data: bytes) -> Uevent:
+    """Parse a raw kernel uevent message.
+
+    A message is a NUL separated header (`action@devpath`) followed by
+    `KEY=VALUE` properties.
+
+    Args:
+        data: Raw message received from the netlink socket.
+
+    Returns:
+        Uevent: Properties of the event, empty if the message is malformed.
+    """
+    event: Uevent = {}
+    for field in data.decode('utf-8', errors='replace').split('\0'):
+        key, sep, value = field.partition('=')
+        if sep:
+            event[key] = value
+    return event
+
+
+class UeventMonitor:
+    """Non-blocking reader for `power_supply` uevents.
+
+    Any datagram socket may be passed in place of the netlink socket. A local
+    `socket.socketpair()` can then be used to inject synthetic uevents.
+    """
+
+    def __init__(self, sock: socket.socket | None = None) -> None:
+        """Open the uevent socket.
+
+        Args:
+            sock: Socket to read from. Defaults to a new netlink uevent socket.
+
+        Raises:
+            OSError: If the netlink socket cannot be opened.
+        """
+        self._sock = sock if sock is not None else open_uevent_socket()
+        self._sock.setblocking(False)
+
+    def fileno(self) -> int:
+        """Return the socket file descriptor, for registering with an event loop."""
+        return self._sock.fileno()
+
+    def read_events(self) -> list[Uevent]:
+        """Return all pending `power_supply` uevents without blocking."""
+        events = []
+        while True:
+            try:
+                data = self._sock.recv(_BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not data:
+                break
+            event = parse_uevent(data)
+            if event.get('SUBSYSTEM') == 'power_supply':
+                events.append(event)
+        return events
+
+    def close(self) -> None:
+        """Close the socket."""
+        self._sock.close()